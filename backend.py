@@ -1,17 +1,28 @@
-from fastapi import FastAPI, Query, Body
+import config  # noqa: F401  (loads .env before any module reads its settings)
+
+from fastapi import FastAPI, HTTPException, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 
+import json
 import os
+import time
+import uuid
 
 # Import your pipeline modules
 from collectors.pdf_collector import PDFCollector
 from collectors.json_collector import JSONCollector
+from collectors.manifest import SourceManifest
 from cleaning.cleaner import TextCleaner
-from chunking.chunker import Chunker
+from chunking.chunker import STRUCTURE, Chunker
 from embeddings.embedder import Embedder
 from embeddings.chromadb_embed import ChromaDBEmbedder
+from pipeline.cache import PipelineCache
+from pipeline.jobs import JobManager
+from pipeline.runner import PIPELINE_STATE_DIR, PipelineRunner, Stage, pipeline_lock
+from utils.ids import stable_id
+from utils.model_registry import get_model_registry
 
 app = FastAPI(
     title="RAG Pipeline API",
@@ -27,8 +38,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global cache (for session efficiency)
-pipeline_cache = {}
+# Shared, bounded cache of the last run per data_dir (SQLite-backed, see pipeline/cache.py)
+pipeline_cache = PipelineCache()
+pipeline_jobs = JobManager()
 
 class PipelineStats(BaseModel):
     pdf_count: int
@@ -36,16 +48,131 @@ class PipelineStats(BaseModel):
     total_count: int
     cleaning_stats: dict
     chunk_count: int
+    new_sources: int = 0
+    modified_sources: int = 0
+    unchanged_sources: int = 0
+    removed_sources: int = 0
 
 class SearchResult(BaseModel):
     metadata: dict
     page_content: str
 
-@app.post("/run_pipeline", response_model=PipelineStats)
-def run_pipeline(data_dir: str = Body(..., embed=True)):
+PERSIST_DIR = "chromadb_store"
+COLLECTION_NAME = "rag_collection"
+
+# Application-lifetime embedder and vector store: search only embeds the query. Each
+# uvicorn worker holds its own Chroma client, loaded from disk when opened, so a pipeline
+# run bumps INDEX_GENERATION_PATH and the other workers reopen the collection on their
+# next search to see its vectors.
+search_embedder: Optional[Embedder] = None
+vector_store = ChromaDBEmbedder(persist_directory=PERSIST_DIR)
+INDEX_GENERATION_PATH = os.path.join(PIPELINE_STATE_DIR, "index_generation")
+_index_generation: Optional[str] = None
+
+@app.on_event("startup")
+def open_search_index():
+    get_model_registry().preload()
+    _search_index()
+
+def _read_index_generation() -> Optional[str]:
+    try:
+        with open(INDEX_GENERATION_PATH, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _bump_index_generation():
+    """Mark the collection as changed; this worker's client already has the changes."""
+    global _index_generation
+    os.makedirs(os.path.dirname(INDEX_GENERATION_PATH), exist_ok=True)
+    generation = uuid.uuid4().hex
+    tmp_path = INDEX_GENERATION_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(tmp_path, INDEX_GENERATION_PATH)
+    _index_generation = generation
+
+def _search_index():
+    global search_embedder, _index_generation
+    if search_embedder is None:
+        search_embedder = Embedder()
+    generation = _read_index_generation()
+    refresh = vector_store.vectorstore is not None and generation != _index_generation
+    if refresh:
+        print("[SEARCH] Collection changed in another worker; reopening it")
+    vector_store.open_collection(search_embedder, COLLECTION_NAME, refresh=refresh)
+    _index_generation = generation
+    return search_embedder, vector_store
+
+def _keep_unchanged(docs, stale_sources):
+    return [doc for doc in docs if doc.metadata.get("source") not in stale_sources]
+
+def _source_fingerprint(manifest: SourceManifest, paths: List[str]) -> str:
+    return stable_id(*(f"{p}:{manifest.metadata_for(p).get('content_hash', '')}" for p in sorted(paths)))
+
+
+def _pipeline_stages(pdf_todo, json_todo, manifest, stale_sources, cleaner, chunker) -> List[Stage]:
+    pdf_collector = PDFCollector()
+    json_collector = JSONCollector()
+
+    def collect(collector, files):
+        def fn(_):
+            docs = collector.load(files) if files else []
+            for doc in docs:
+                doc.metadata.update(manifest.metadata_for(doc.metadata["source"]))
+            return docs, {}
+        return fn
+
+    def clean(inputs):
+        cleaned = cleaner.clean_documents(inputs["collect_pdf"] + inputs["collect_json"])
+        return cleaned, {"stats": cleaner.get_cleaning_stats(), "errors": cleaner.stats.errors}
+
+    def chunk(inputs):
+        return (chunker.chunk_documents(inputs["clean"]) if inputs["clean"] else []), {}
+
+    def embed(inputs):
+        chunked_docs = inputs["chunk"]
+        if not stale_sources and not chunked_docs:
+            print("[PIPELINE] No source changes detected; collection left as is.")
+            return [], {}
+        embedder, chroma_db_embedder = _search_index()
+        try:
+            chroma_db_embedder.delete_sources(embedder, stale_sources, collection_name=COLLECTION_NAME)
+            if chunked_docs and chroma_db_embedder.store_embeddings(
+                embedder, chunked_docs, collection_name=COLLECTION_NAME
+            ) is None:
+                raise RuntimeError("embedding failed")
+        finally:
+            _bump_index_generation()
+        return [], {"stored": len(chunked_docs)}
+
+    return [
+        Stage("collect_pdf", collect(pdf_collector, pdf_todo),
+              fingerprint=stable_id(_source_fingerprint(manifest, pdf_todo), pdf_collector.page_level)),
+        Stage("collect_json", collect(json_collector, json_todo),
+              fingerprint=_source_fingerprint(manifest, json_todo)),
+        Stage("clean", clean, deps=["collect_pdf", "collect_json"],
+              fingerprint=json.dumps(cleaner._options(), sort_keys=True)),
+        Stage("chunk", chunk, deps=["clean"],
+              fingerprint=stable_id(chunker.strategy, *chunker._params("context"), *chunker._params("token"))),
+        Stage("embed", embed, deps=["chunk"],
+              fingerprint=stable_id(COLLECTION_NAME, *sorted(stale_sources)), cacheable=False),
+    ]
+
+
+def _run_pipeline(data_dir: str, incremental: bool = True, progress=None) -> PipelineStats:
     """
-    Trigger the whole pipeline on data_dir. Collects PDFs/JSONs, cleans, chunks, embeds.
+    Collect -> clean -> chunk -> embed as a DAG of checkpointed stages. Stages whose
+    inputs (source content hashes, upstream outputs, config) are unchanged are loaded
+    from their checkpoints, so rerunning after a failure resumes where it stopped.
+    A full rebuild (`incremental=False`) reruns every stage.
     """
+    # /run_pipeline and /pipeline_jobs, in any worker, share the manifest, checkpoints and collection
+    with pipeline_lock():
+        return _run_pipeline_locked(data_dir, incremental, progress)
+
+
+def _run_pipeline_locked(data_dir: str, incremental: bool, progress) -> PipelineStats:
     if not os.path.isdir(data_dir):
         return PipelineStats(
             pdf_count=0,
@@ -54,48 +181,97 @@ def run_pipeline(data_dir: str = Body(..., embed=True)):
             cleaning_stats={},
             chunk_count=0
         )
-    pdf_collector = PDFCollector()
-    json_collector = JSONCollector()
-    pdf_docs = pdf_collector.load(data_dir)
-    json_docs = json_collector.load(data_dir)
-    all_docs = pdf_docs + json_docs
+    pdf_files = PDFCollector().list_files(data_dir)
+    json_files = JSONCollector().list_files(data_dir)
 
-    cleaner = TextCleaner()
-    cleaned_docs = cleaner.clean_documents(all_docs)
-    stats = cleaner.get_cleaning_stats(all_docs, cleaned_docs)
+    manifest = SourceManifest()
+    changes = manifest.diff(pdf_files + json_files, scope=os.path.abspath(data_dir))
+    if incremental:
+        to_process = set(changes["new"] + changes["modified"])
+    else:
+        to_process = set(pdf_files + json_files)
+    stale_sources = set(changes["modified"] + changes["removed"])
+    if not incremental:
+        stale_sources |= to_process
 
+    pdf_todo = [f for f in pdf_files if f in to_process]
+    json_todo = [f for f in json_files if f in to_process]
     chunker = Chunker()
-    chunked_docs = chunker.chunk_documents(cleaned_docs)
+    cleaner = TextCleaner(keep_line_breaks=chunker.strategy == STRUCTURE)
+    runner = PipelineRunner(
+        _pipeline_stages(pdf_todo, json_todo, manifest, stale_sources, cleaner, chunker),
+        progress=progress,
+    )
+    results = runner.run(force=not incremental)
+    manifest.commit(changes)
+
+    pdf_docs = results["collect_pdf"].docs
+    json_docs = results["collect_json"].docs
+    cleaned_docs = results["clean"].docs
+    chunked_docs = results["chunk"].docs
+    stats = results["clean"].info.get("stats", {})
 
-    # Cache results
-    pipeline_cache[data_dir] = {
-        "pdf_docs": pdf_docs,
-        "json_docs": json_docs,
-        "cleaned_docs": cleaned_docs,
-        "chunked_docs": chunked_docs,
-        "stats": stats
-    }
+    # Cache results, keeping documents of unchanged sources from the previous run
+    previous = (pipeline_cache.get(data_dir) or {}) if incremental else {}
+    pipeline_cache.put(data_dir, {
+        "pdf_docs": _keep_unchanged(previous.get("pdf_docs", []), stale_sources) + pdf_docs,
+        "json_docs": _keep_unchanged(previous.get("json_docs", []), stale_sources) + json_docs,
+        "cleaned_docs": _keep_unchanged(previous.get("cleaned_docs", []), stale_sources) + cleaned_docs,
+        "chunked_docs": _keep_unchanged(previous.get("chunked_docs", []), stale_sources) + chunked_docs,
+        "stats": stats,
+        "clean_errors": results["clean"].info.get("errors", []),
+    })
 
     return PipelineStats(
         pdf_count=len(pdf_docs),
         json_count=len(json_docs),
-        total_count=len(all_docs),
+        total_count=len(pdf_docs) + len(json_docs),
         cleaning_stats=stats,
-        chunk_count=len(chunked_docs)
+        chunk_count=len(chunked_docs),
+        new_sources=len(changes["new"]),
+        modified_sources=len(changes["modified"]),
+        unchanged_sources=len(changes["unchanged"]),
+        removed_sources=len(changes["removed"]),
+    )
+
+@app.post("/run_pipeline", response_model=PipelineStats)
+def run_pipeline(data_dir: str = Body(..., embed=True), incremental: bool = Body(True, embed=True)):
+    """
+    Trigger the whole pipeline on data_dir and wait for it. Collects PDFs/JSONs, cleans,
+    chunks, embeds. With `incremental`, only new or modified files are reprocessed and
+    vectors of removed files are deleted from the collection.
+    """
+    return _run_pipeline(data_dir, incremental)
+
+@app.post("/pipeline_jobs")
+def start_pipeline_job(data_dir: str = Body(..., embed=True), incremental: bool = Body(True, embed=True)):
+    """
+    Same as /run_pipeline, but runs in the background. Poll /pipeline_jobs/{job_id}.
+    """
+    job_id = pipeline_jobs.submit(
+        lambda progress: _run_pipeline(data_dir, incremental, progress=progress).dict()
     )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/pipeline_jobs/{job_id}")
+def pipeline_job_status(job_id: str):
+    """Status, current stage, progress and (once finished) result or error of a pipeline job."""
+    job = pipeline_jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
 
 @app.get("/sample_docs", response_model=List[SearchResult])
 def sample_docs(data_dir: str = Query(...), n: int = Query(5)):
     """
     Returns up to n sample cleaned documents from last run of pipeline.
     """
-    cache = pipeline_cache.get(data_dir)
-    if not cache:
+    docs = pipeline_cache.get_docs(data_dir, "cleaned_docs", limit=n)
+    if not docs:
         return []
-    docs = cache["cleaned_docs"]
     return [
         SearchResult(metadata=doc.metadata, page_content=doc.page_content)
-        for doc in docs[:n]
+        for doc in docs
     ]
 
 @app.get("/sample_chunks", response_model=List[SearchResult])
@@ -103,38 +279,45 @@ def sample_chunks(data_dir: str = Query(...), n: int = Query(5)):
     """
     Returns up to n sample chunked documents from last run of pipeline.
     """
-    cache = pipeline_cache.get(data_dir)
-    if not cache:
+    docs = pipeline_cache.get_docs(data_dir, "chunked_docs", limit=n)
+    if not docs:
         return []
-    docs = cache["chunked_docs"]
     return [
         SearchResult(metadata=doc.metadata, page_content=doc.page_content)
-        for doc in docs[:n]
+        for doc in docs
     ]
 
 @app.post("/semantic_search", response_model=List[SearchResult])
 def semantic_search(
-    data_dir: str = Body(..., embed=True),
     query: str = Body(..., embed=True),
-    k: int = Body(5, embed=True)
+    k: int = Body(5, embed=True),
+    data_dir: Optional[str] = Body(None, embed=True)
 ):
     """
-    Perform a vector DB semantic retrieval for query string.
+    Perform a vector DB semantic retrieval for query string. Query-only: embeds the
+    query and searches the collection built by /run_pipeline (`data_dir` is accepted
+    for compatibility and ignored).
     """
-    cache = pipeline_cache.get(data_dir)
-    if not cache or not cache["chunked_docs"]:
-        return []
-
-    embedder = Embedder()
-    chroma_db_embedder = ChromaDBEmbedder(persist_directory="chromadb_store")
-    chroma_db_embedder.store_embeddings(embedder, cache["chunked_docs"], collection_name="rag_collection")
-    results = chroma_db_embedder.similarity_search(query, embedder, k=k)
+    start = time.perf_counter()
+    embedder, store = _search_index()
+    results = store.similarity_search(query, embedder, k=k)
+    print(f"[SEARCH] {len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
 
     return [
         SearchResult(metadata=res.metadata, page_content=res.page_content)
         for res in results
     ]
 
+@app.get("/models")
+def loaded_models():
+    """Models resident in this worker, with load time and memory footprint."""
+    return get_model_registry().stats()
+
+@app.get("/pipeline_cache/stats")
+def pipeline_cache_stats():
+    """Hit/miss, eviction and memory/disk byte accounting of this worker's pipeline cache."""
+    return pipeline_cache.stats()
+
 @app.get("/")
 def hello():
     return {"status": "OK", "message": "RAG Pipeline backend is running!"}
@@ -1,23 +1,72 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import os, re, json
+from typing import List, Dict, Any, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+import asyncio, os, re, json, time, threading, weakref
 
-from langchain_groq import ChatGroq
 from langchain_core.runnables import RunnableLambda, RunnableMap, RunnableParallel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_community.vectorstores import Chroma
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 
 from .prompt_loader import PromptConfig
-from retrieval.simple_retriever import load_chroma, retrieve_with_crossencoder_rerank
+from retrieval.simple_retriever import load_chroma, retrieve_with_crossencoder_rerank, search_candidates
+from retrieval.reranker import get_reranker_registry
 
 CHAT_MODEL = os.getenv("CHAT_MODEL", "openai/gpt-oss-120b")
 
+# ChatGroq clients are stateless per call, so every CRC with the same settings shares one.
+# Their async httpx client is bound to the event loop that first used it, so clients used
+# inside a running loop are pooled per loop (and dropped with it).
+_LLM_POOL: Dict[tuple, Any] = {}
+_LOOP_LLM_POOLS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[tuple, Any]]" = weakref.WeakKeyDictionary()
+_LLM_POOL_LOCK = threading.Lock()
+
+# (temperature, max_tokens) of each LLM the graph may call
+LLM_SETTINGS = {
+    "refine": (0.1, 120),
+    "hist": (0.1, 256),
+    "ctx": (0.2, 256),
+}
+
 def _groq(temp=0.2, max_tokens=800):
-    return ChatGroq(model=CHAT_MODEL, temperature=temp, top_p=0.8, max_tokens=max_tokens, frequency_penalty=0.2)
+    key = (CHAT_MODEL, temp, max_tokens)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    with _LLM_POOL_LOCK:
+        pool = _LLM_POOL if loop is None else _LOOP_LLM_POOLS.setdefault(loop, {})
+        llm = pool.get(key)
+        if llm is None:
+            from langchain_groq import ChatGroq  # deferred: the groq SDK is only needed once an LLM is called
+
+            llm = ChatGroq(model=CHAT_MODEL, temperature=temp, top_p=0.8, max_tokens=max_tokens, frequency_penalty=0.2)
+            pool[key] = llm
+        return llm
+
+# Embedding and CrossEncoder reranking are blocking CPU work; async callers run them here
+CRC_RETRIEVAL_WORKERS = int(os.getenv("CRC_RETRIEVAL_WORKERS", "4"))
+_retrieval_pool: ThreadPoolExecutor | None = None
+_retrieval_pool_lock = threading.Lock()
+
+def _retrieval_executor() -> ThreadPoolExecutor:
+    global _retrieval_pool
+    with _retrieval_pool_lock:
+        if _retrieval_pool is None:
+            _retrieval_pool = ThreadPoolExecutor(max_workers=CRC_RETRIEVAL_WORKERS, thread_name_prefix="crc-retrieve")
+        return _retrieval_pool
+
+# Speculative retrieval: search on the raw question while the refine LLM call runs, and
+# keep those results when the refined query's token Jaccard similarity reaches the threshold
+CRC_SPECULATIVE_RETRIEVAL = os.getenv("CRC_SPECULATIVE_RETRIEVAL", "false").lower() in ("1", "true", "yes")
+CRC_SPECULATIVE_MIN_SIMILARITY = float(os.getenv("CRC_SPECULATIVE_MIN_SIMILARITY", "0.6"))
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+def _query_similarity(a: str, b: str) -> float:
+    ta, tb = set(_TOKEN_PATTERN.findall(a.lower())), set(_TOKEN_PATTERN.findall(b.lower()))
+    if not ta and not tb:
+        return 1.0
+    return len(ta & tb) / len(ta | tb)
 
 def _format_history(history: List[dict], max_chars: int = 4000) -> str:
     out, total = [], 0
@@ -46,12 +95,26 @@ class CRC:
         crossencoder_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
         pool_k: int = int(os.getenv("RETRIEVER_POOL_K", "60")),
         top_k: int = int(os.getenv("RETRIEVER_TOP_K", "5")),
+        reranker_device: str | None = os.getenv("RERANKER_DEVICE") or None,
+        warm_up_reranker: bool = True,
+        speculative_retrieval: bool = CRC_SPECULATIVE_RETRIEVAL,
+        speculative_min_similarity: float = CRC_SPECULATIVE_MIN_SIMILARITY,
     ):
         self.cfg = PromptConfig.load(crc_prompt_path)
         self.chroma = chroma
         self.crossencoder = crossencoder_model
+        self.reranker_device = reranker_device
         self.pool_k = pool_k
         self.top_k = top_k
+        self.speculative_retrieval = speculative_retrieval
+        self.speculative_min_similarity = speculative_min_similarity
+
+        # Load the CrossEncoder up front so the first chat turn does not pay for it
+        if warm_up_reranker and self.crossencoder:
+            try:
+                get_reranker_registry().warm_up(self.crossencoder, self.reranker_device)
+            except Exception as e:
+                print(f"[RERANK] Warm-up failed, will load lazily: {e}")
 
         # Build refine prompt
         self.refine_prompt = ChatPromptTemplate.from_messages(
@@ -66,36 +129,43 @@ class CRC:
             [("system", "\n".join(self.cfg.data["context_answer"]["system"])), ("human", "{user_message}")]
         )
 
-        # LLMs
-        self.llm_refine = _groq(temp=0.1, max_tokens=120)
-        self.llm_hist = _groq(temp=0.1, max_tokens=256)
-        self.llm_ctx = _groq(temp=0.2, max_tokens=256)
-
-        # ConversationalRetrievalChain for context stage
-        # We will adapt it by injecting reranked docs and strict prompt for answering.
-        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self.retriever = self.chroma.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": self.pool_k}
-        )
+        self._graph = None
+        self._context_graph = None
 
-        self.conv_chain = ConversationalRetrievalChain.from_llm(
-            llm=self.llm_ctx,
-            retriever=self.retriever,
-            return_source_documents=True,
-            verbose=False,
-        )
+    # LLMs and the graph are built on first use, so creating a CRC per session stays cheap
+    @property
+    def llm_refine(self):
+        return _groq(*LLM_SETTINGS["refine"])
 
-        # Build runnables
-        self.graph = self._build_graph()
+    @property
+    def llm_hist(self):
+        return _groq(*LLM_SETTINGS["hist"])
 
-    def _refine_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        question, history = inputs["question"], inputs["history"]
+    @property
+    def llm_ctx(self):
+        return _groq(*LLM_SETTINGS["ctx"])
+
+    @property
+    def context_graph(self):
+        if self._context_graph is None:
+            self._context_graph = self._build_context_graph()
+        return self._context_graph
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._graph = self._build_graph()
+        return self._graph
+
+    def _refine_messages(self, inputs: Dict[str, Any]):
         user_msg = self.cfg.data["refine"]["user_template"].format(
-            history=_format_history(history), question=question
+            history=_format_history(inputs["history"]), question=inputs["question"]
         )
-        msgs = self.refine_prompt.format_messages(user_message=user_msg)
-        text = self.llm_refine.invoke(msgs).content.strip()
+        return self.refine_prompt.format_messages(user_message=user_msg)
+
+    def _parse_refine(self, inputs: Dict[str, Any], text: str, refine_ms: float) -> Dict[str, Any]:
+        question = inputs["question"]
+        inputs = {**inputs, "timings": {"refine_ms": refine_ms}}
 
         out = {"route": "RETRIEVE", "query": question, "answer": None, "raw": text}
         if "ROUTE=HISTORY" in text and "ANSWER='" in text:
@@ -114,57 +184,173 @@ class CRC:
                 pass
         return {**inputs, "refine": out}
 
+    def _refine_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        msgs = self._refine_messages(inputs)
+        t0 = time.perf_counter()
+        text = self.llm_refine.invoke(msgs).content.strip()
+        return self._parse_refine(inputs, text, (time.perf_counter() - t0) * 1000)
+
+    async def _arefine_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        msgs = self._refine_messages(inputs)
+        t0 = time.perf_counter()
+        text = (await self.llm_refine.ainvoke(msgs)).content.strip()
+        return self._parse_refine(inputs, text, (time.perf_counter() - t0) * 1000)
+
     def _retrieve_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         if inputs["refine"]["route"] == "HISTORY":
             return {**inputs, "docs": []}
-        # get candidate docs from retriever
-        docs = self.retriever.get_relevant_documents(inputs["refine"]["query"])
+        query = inputs["refine"]["query"]
+        timings: Dict[str, float] = dict(inputs.get("timings", {}))
+        # one query embedding + one ANN search feeds both the rerank and the fallback path
+        candidates, _ = search_candidates(query, self.chroma, pool_k=self.pool_k, timings=timings)
         # optional: apply CrossEncoder reranking
         try:
             docs = retrieve_with_crossencoder_rerank(
-                query=inputs["refine"]["query"],
+                query=query,
                 chroma=self.chroma,
                 crossencoder_model=self.crossencoder,
                 pool_k=self.pool_k,
                 top_k=self.top_k,
+                device=self.reranker_device,
+                candidates=candidates,
+                timings=timings,
             )
         except Exception:
             # if reranker fails, fall back to retriever docs truncated to top_k
-            docs = docs[: self.top_k]
-        return {**inputs, "docs": docs}
+            docs = candidates[: self.top_k]
+        print("[CRC] Retrieval timings (ms): " + ", ".join(f"{k}={v:.1f}" for k, v in timings.items()))
+        return {**inputs, "docs": docs, "timings": timings}
 
+    async def _aretrieve_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        if inputs["refine"]["route"] == "HISTORY":
+            return {**inputs, "docs": []}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_retrieval_executor(), self._retrieve_step, inputs)
 
-    def _answer_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        question, history, docs, refine = inputs["question"], inputs["history"], inputs["docs"], inputs["refine"]
-
+    def _answer_messages(self, inputs: Dict[str, Any]):
+        """Messages for the context answer, or None when the refine step already answered from history."""
+        refine = inputs["refine"]
         if refine["route"] == "HISTORY" and refine["answer"]:
-            # Optionally pass through hist_prompt to normalize tone
-            user_msg = self.cfg.data["history_answer"]["user_template"].format(
-                history=_format_history(history), question=question
-            )
-            msgs = self.hist_prompt.format_messages(user_message=user_msg)
-            # If strict formatting desired, could ignore llm here and use refine answer directly
-            final = refine["answer"]
-            return {"answer": final, "docs": []}
-
-        # Context-only answer
+            return None
         user_msg = self.cfg.data["context_answer"]["user_template"].format(
-            question=question, context=_join_context(docs)
+            question=inputs["question"], context=_join_context(inputs["docs"])
         )
-        msgs = self.ctx_prompt.format_messages(user_message=user_msg)
+        return self.ctx_prompt.format_messages(user_message=user_msg)
+
+    def _answer_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        msgs = self._answer_messages(inputs)
+        if msgs is None:
+            return {"answer": inputs["refine"]["answer"], "docs": [], "timings": inputs.get("timings", {})}
+
+        # Context-only answer
+        t0 = time.perf_counter()
         final = self.llm_ctx.invoke(msgs).content
-        return {"answer": final, "docs": docs}
+        timings = {**inputs.get("timings", {}), "answer_ms": (time.perf_counter() - t0) * 1000}
+        return {"answer": final, "docs": inputs["docs"], "timings": timings}
 
-    def _build_graph(self):
+    async def _aanswer_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        msgs = self._answer_messages(inputs)
+        if msgs is None:
+            return {"answer": inputs["refine"]["answer"], "docs": [], "timings": inputs.get("timings", {})}
+
+        t0 = time.perf_counter()
+        final = (await self.llm_ctx.ainvoke(msgs)).content
+        timings = {**inputs.get("timings", {}), "answer_ms": (time.perf_counter() - t0) * 1000}
+        return {"answer": final, "docs": inputs["docs"], "timings": timings}
+
+    def _speculate_step(self, inputs: Dict[str, Any]):
+        """Start retrieval for the raw question in the background; the Future is reconciled after refine."""
+        guess = {**inputs, "refine": {"route": "RETRIEVE", "query": inputs["question"], "answer": None}, "timings": {}}
+        return _retrieval_executor().submit(self._retrieve_step, guess)
+
+    def _use_speculation(self, inputs: Dict[str, Any]) -> bool:
+        refined = inputs["refined"]
+        if refined["refine"]["route"] == "HISTORY":
+            return False
+        similarity = _query_similarity(refined["refine"]["query"], refined["question"])
+        return similarity >= self.speculative_min_similarity
+
+    def _merge_speculation(self, inputs: Dict[str, Any], speculative: Dict[str, Any]) -> Dict[str, Any]:
+        refined = inputs["refined"]
+        timings = {**refined["timings"], **speculative["timings"], "speculative_hit": 1.0}
+        return {**refined, "docs": speculative["docs"], "timings": timings}
+
+    def _reconcile_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        future = inputs["speculative"]
+        if self._use_speculation(inputs):
+            try:
+                return self._merge_speculation(inputs, future.result())
+            except Exception as e:
+                print(f"[CRC] Speculative retrieval failed, retrieving again: {e}")
+        else:
+            future.cancel()  # a search already running is left to finish and discarded
+        refined = {**inputs["refined"], "timings": {**inputs["refined"]["timings"], "speculative_hit": 0.0}}
+        return self._retrieve_step(refined)
+
+    async def _areconcile_step(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        future = inputs["speculative"]
+        if self._use_speculation(inputs):
+            try:
+                return self._merge_speculation(inputs, await asyncio.wrap_future(future))
+            except Exception as e:
+                print(f"[CRC] Speculative retrieval failed, retrieving again: {e}")
+        else:
+            future.cancel()
+        refined = {**inputs["refined"], "timings": {**inputs["refined"]["timings"], "speculative_hit": 0.0}}
+        return await self._aretrieve_step(refined)
+
+    def _build_context_graph(self):
+        """question/history -> refine -> retrieve; each step has a sync and an async implementation."""
+        inputs = RunnableMap({
+            "question": lambda x: x["question"],
+            "history": lambda x: x["history"],
+        })
+        if self.speculative_retrieval:
+            return (
+                inputs
+                | RunnableParallel(
+                    refined=RunnableLambda(self._refine_step, afunc=self._arefine_step),
+                    speculative=RunnableLambda(self._speculate_step),
+                )
+                | RunnableLambda(self._reconcile_step, afunc=self._areconcile_step)
+            )
         return (
-            RunnableMap({
-                "question": lambda x: x["question"],
-                "history": lambda x: x["history"],
-            })
-            | RunnableLambda(self._refine_step)
-            | RunnableLambda(self._retrieve_step)
-            | RunnableLambda(self._answer_step)
+            inputs
+            | RunnableLambda(self._refine_step, afunc=self._arefine_step)
+            | RunnableLambda(self._retrieve_step, afunc=self._aretrieve_step)
         )
 
+    def _build_graph(self):
+        return self.context_graph | RunnableLambda(self._answer_step, afunc=self._aanswer_step)
+
     def invoke(self, question: str, history: List[dict]) -> Dict[str, Any]:
         return self.graph.invoke({"question": question, "history": history})
+
+    async def ainvoke(self, question: str, history: List[dict]) -> Dict[str, Any]:
+        return await self.graph.ainvoke({"question": question, "history": history})
+
+    async def astream(self, question: str, history: List[dict]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields {"type": "token", "content": ...} as the answer is generated, then one
+        {"type": "done", "answer", "docs", "timings"} event with the same fields as invoke().
+        """
+        inputs = await self.context_graph.ainvoke({"question": question, "history": history})
+        timings = dict(inputs.get("timings", {}))
+        msgs = self._answer_messages(inputs)
+        if msgs is None:
+            answer = inputs["refine"]["answer"]
+            yield {"type": "token", "content": answer}
+            yield {"type": "done", "answer": answer, "docs": [], "timings": timings}
+            return
+
+        parts = []
+        t0 = time.perf_counter()
+        async for chunk in self.llm_ctx.astream(msgs):
+            if not chunk.content:
+                continue
+            if not parts:
+                timings["first_token_ms"] = (time.perf_counter() - t0) * 1000
+            parts.append(chunk.content)
+            yield {"type": "token", "content": chunk.content}
+        timings["answer_ms"] = (time.perf_counter() - t0) * 1000
+        yield {"type": "done", "answer": "".join(parts), "docs": inputs["docs"], "timings": timings}
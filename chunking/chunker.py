@@ -1,15 +1,93 @@
-import json
-import uuid
-from typing import List
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Optional
 from langchain_core.documents import Document
 
+from chunking.structure_splitter import StructureTextSplitter
+from utils.checkpoints import get_checkpoint_store
+from utils.ids import document_id, stable_id
+from utils.parallel import batched, submit_bounded
+
+
+
+STRATEGIES = ("context", "token", "sentence", "word")
+# structure-aware splitting; only used when asked for, since it needs line breaks kept by the cleaner
+STRUCTURE = "structure"
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "auto")
+# auto picks the first strategy (in STRATEGIES order) expected to produce more chunks than this
+MIN_CHUNKS = int(os.getenv("CHUNK_MIN_CHUNKS", "300"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "1"))
+CHUNK_BATCH_SIZE = int(os.getenv("CHUNK_BATCH_SIZE", "64"))
+# rough chars per token for cl100k / mpnet wordpiece on English product text
+CHARS_PER_TOKEN = 4.0
+
+
+@lru_cache(maxsize=None)
+def _build_splitter(strategy: str, size: int, overlap: int):
+    """Splitters (and their tokenizers) are built once per process and reused across Chunkers."""
+    from langchain_text_splitters import (
+        RecursiveCharacterTextSplitter,
+        TokenTextSplitter,
+        CharacterTextSplitter
+    )
+    from chunking.sentence_splitter import SentenceTokenTextSplitter
+
+    if strategy == "context":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=size,
+            chunk_overlap=overlap,
+            length_function=len,
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
+        )
+    if strategy == "token":
+        return TokenTextSplitter(
+            encoding_name="cl100k_base",
+            chunk_size=size,
+            chunk_overlap=overlap,
+            add_start_index=True
+        )
+    if strategy == "sentence":
+        return SentenceTokenTextSplitter(
+            # all-mpnet-base-v2's tokenizer, shared through the model registry
+            tokens_per_chunk=size,
+            chunk_overlap=overlap,
+            add_start_index=True
+        )
+    if strategy == "word":
+        return CharacterTextSplitter(
+            separator=" ",
+            chunk_size=size,
+            chunk_overlap=overlap,
+            add_start_index=True
+        )
+    if strategy == STRUCTURE:
+        return StructureTextSplitter(
+            chunk_size=size,
+            chars_per_token=CHARS_PER_TOKEN,
+            fallback=_build_splitter("token", size, overlap)
+        )
+    raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+
+def _init_worker(strategy: str, size: int, overlap: int):
+    # Load the splitter/tokenizer once per worker process, before any batch arrives
+    _build_splitter(strategy, size, overlap)
+
+
+def _split_batch(strategy: str, size: int, overlap: int, documents: List[Document]) -> List[Document]:
+    return _build_splitter(strategy, size, overlap).split_documents(documents)
+
+
+def _windows(length: float, size: int, overlap: int) -> int:
+    if length <= 0:
+        return 0
+    if length <= size:
+        return 1
+    return math.ceil((length - overlap) / max(1, size - overlap))
 
-from langchain_text_splitters import (
-    RecursiveCharacterTextSplitter,
-    TokenTextSplitter,
-    SentenceTransformersTokenTextSplitter,
-    CharacterTextSplitter
-)
 
 class Chunker:
 
@@ -24,7 +102,11 @@ class Chunker:
         sentence_token_overlap: int = 32,
         word_chunk_size: int = 100,
         word_chunk_overlap: int = 10,
-        backup_path: str = "chunking/chunked_docs_backup.jsonl"
+        backup_path: str = "chunking/chunked_docs_backup.jsonl",
+        strategy: str = CHUNK_STRATEGY,
+        workers: int = CHUNK_WORKERS,
+        batch_size: int = CHUNK_BATCH_SIZE,
+        checkpoints=None
     ):
 
         self.chunk_size = chunk_size
@@ -36,72 +118,135 @@ class Chunker:
         self.word_chunk_size = word_chunk_size
         self.word_chunk_overlap = word_chunk_overlap
         self.backup_path = backup_path
+        self.checkpoints = checkpoints or get_checkpoint_store()
+        self.strategy = strategy
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+    def _params(self, strategy: str):
+        return {
+            "context": (self.chunk_size, self.chunk_overlap),
+            "token": (self.token_chunk_size, self.token_chunk_overlap),
+            STRUCTURE: (self.token_chunk_size, self.token_chunk_overlap),
+            "sentence": (self.sentence_token_chunk_size, self.sentence_token_overlap),
+            "word": (self.word_chunk_size, self.word_chunk_overlap),
+        }[strategy]
+
+    def splitter(self, strategy: str):
+        return _build_splitter(strategy, *self._params(strategy))
 
     def context_split(self, documents: List[Document]) -> List[Document]:
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        return splitter.split_documents(documents)
+        return self.splitter("context").split_documents(documents)
 
     def token_split(self, documents: List[Document]) -> List[Document]:
-
-        splitter = TokenTextSplitter(
-            encoding_name="cl100k_base",
-            chunk_size=self.token_chunk_size,
-            chunk_overlap=self.token_chunk_overlap
-        )
-        return splitter.split_documents(documents)
+        return self.splitter("token").split_documents(documents)
 
     def sentence_split(self, documents: List[Document]) -> List[Document]:
-        splitter = SentenceTransformersTokenTextSplitter(
-            # Default model: 'sentence-transformers/all-mpnet-base-v2'
-            tokens_per_chunk=self.sentence_token_chunk_size,
-            chunk_overlap=self.sentence_token_overlap
-        )
-        return splitter.split_documents(documents)
+        return self.splitter("sentence").split_documents(documents)
 
     def word_split(self, documents: List[Document]) -> List[Document]:
-        splitter = CharacterTextSplitter(
-            separator=" ",
-            chunk_size=self.word_chunk_size,
-            chunk_overlap=self.word_chunk_overlap
-        )
-        return splitter.split_documents(documents)
-
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
-
-        for chunk_fn in [
-            self.context_split,
-            self.token_split,
-            self.sentence_split,
-            self.word_split
-        ]:
-            chunks = chunk_fn(documents)
-            print(f"[CHUNKER] Used {chunk_fn.__name__} splitting, produced {len(chunks)} chunks.")
-            if len(chunks) > 300:
-                print(f"[CHUNKER] Used {chunk_fn.__name__} splitting, produced {len(chunks)} chunks.")
-                self.backup_jsonl(chunks)
-                return chunks
+        return self.splitter("word").split_documents(documents)
+
+    def estimate_chunk_count(self, documents: List[Document], strategy: str) -> int:
+        """Expected number of chunks from document lengths alone, without splitting anything."""
+        size, overlap = self._params(strategy)
+        per_token = strategy in ("token", "sentence", STRUCTURE)
+        total = 0
+        for doc in documents:
+            length = len(doc.page_content)
+            if per_token:
+                length /= CHARS_PER_TOKEN
+            total += _windows(length, size, overlap)
+        return total
+
+    def choose_strategy(self, documents: List[Document]) -> str:
+        """
+        Same rule as the old try-them-all loop (first strategy giving more than MIN_CHUNKS
+        chunks, else word splitting), but decided from estimates so only one pass runs.
+        """
+        for strategy in STRATEGIES:
+            estimate = self.estimate_chunk_count(documents, strategy)
+            if estimate > MIN_CHUNKS:
+                print(f"[CHUNKER] Estimated {estimate} chunks with {strategy} splitting.")
+                return strategy
+        return STRATEGIES[-1]
+
+    def split(self, documents: List[Document], strategy: str) -> List[Document]:
+        """Split with one strategy, sharding documents across a process pool when workers > 1."""
+        if self.workers <= 1 or len(documents) <= self.batch_size:
+            return self.splitter(strategy).split_documents(documents)
+        return list(self._iter_split_parallel(documents, strategy))
+
+    def _iter_split_parallel(self, documents: List[Document], strategy: str) -> Iterator[Document]:
+        # Each worker keeps its own splitter/tokenizer; batches come back in submission order
+        params = (strategy,) + self._params(strategy)
+
+        def submit(pool, batch):
+            return pool.submit(_split_batch, *params, batch)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=params) as pool:
+            for _, future in submit_bounded(pool, batched(documents, self.batch_size), submit, self.workers):
+                yield from future.result()
+
+    def _with_doc_ids(self, documents: List[Document]) -> List[Document]:
+        out = []
+        for i, doc in enumerate(documents):
+            metadata = dict(doc.metadata or {})
+            metadata["doc_id"] = document_id(doc, i)
+            out.append(Document(page_content=doc.page_content, metadata=metadata))
+        return out
+
+    def _assign_chunk_ids(self, chunks: List[Document], documents: List[Document]) -> List[Document]:
+        """
+        Give every chunk a deterministic id from its document id and character offset.
+        Offsets are located in the source text, searching forward from the previous chunk's
+        start: the token splitters' start_index comes from char-based overlap math and is
+        often -1. A chunk that is not a verbatim slice of its document (the sentence
+        splitter decodes wordpieces) keeps start_char = end_char = -1.
+        """
+        texts = {doc.metadata["doc_id"]: doc.page_content for doc in documents}
+        counters = {}
+        search_from = {}
+        unplaced = 0
+        for chunk in chunks:
+            doc_id = chunk.metadata.get("doc_id", "")
+            chunk_index = counters.get(doc_id, 0)
+            counters[doc_id] = chunk_index + 1
+            text = texts.get(doc_id, "")
+            content = chunk.page_content
+            start_char = chunk.metadata.pop("start_index", -1)
+            if start_char < 0 or text[start_char:start_char + len(content)] != content:
+                start_char = text.find(content, search_from.get(doc_id, 0))
+            if start_char >= 0:
+                search_from[doc_id] = start_char + 1
             else:
-                print(f"[CHUNKER] {chunk_fn.__name__} did not produce enough chunks, trying next...")
-
-        print(f"[CHUNKER] Falling back to final chunking method with {len(chunks)} chunks.")
-        self.backup_jsonl(chunks)
+                unplaced += 1
+            chunk.metadata["chunk_index"] = chunk_index
+            chunk.metadata["start_char"] = start_char
+            chunk.metadata["end_char"] = start_char + len(content) if start_char >= 0 else -1
+            chunk.metadata["chunk_id"] = stable_id(doc_id, chunk_index, start_char)
+        if unplaced:
+            print(f"[CHUNKER] {unplaced} chunks are not verbatim slices of their document; offsets left at -1")
         return chunks
 
-    def backup_jsonl(self, chunked_docs: List[Document]):
+    def chunk_documents(self, documents: List[Document], strategy: Optional[str] = None) -> List[Document]:
+        """Split with `strategy` (or self.strategy); "auto" picks one up front from length estimates."""
+        documents = self._with_doc_ids(documents)
+        strategy = strategy or self.strategy
+        if strategy == "auto":
+            strategy = self.choose_strategy(documents)
+        if strategy not in STRATEGIES and strategy != STRUCTURE:
+            raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+        chunks = self.split(documents, strategy)
+        print(f"[CHUNKER] Used {strategy}_split splitting, produced {len(chunks)} chunks "
+              f"(workers={self.workers}).")
+        chunks = self._assign_chunk_ids(chunks, documents)
+        self.backup(chunks)
+        return chunks
 
-        with open(self.backup_path, "w", encoding="utf-8") as f:
+    def backup(self, chunked_docs: List[Document]):
+        with self.checkpoints.writer(self.backup_path) as backup:
             for doc in chunked_docs:
-                entry = {
-                    "id": str(uuid.uuid4()),
-                    "page_content": doc.page_content,
-                    "metadata": doc.metadata
-                }
-                json.dump(entry, f, ensure_ascii=False)
-                f.write("\n")
-        print(f"[CHUNKER] Backup of {len(chunked_docs)} chunks saved to {self.backup_path}")
-
+                backup.write(doc.metadata.get("chunk_id"), doc.page_content, doc.metadata)
+        print(f"[CHUNKER] Backup of {len(chunked_docs)} chunks saved to {backup.path}")
@@ -0,0 +1,41 @@
+from typing import List
+
+from langchain_text_splitters import TextSplitter, Tokenizer, split_text_on_tokens
+
+from utils.model_registry import get_model_registry
+
+SENTENCE_MODEL = "sentence-transformers/all-mpnet-base-v2"
+_NO_TRUNCATION = 2 ** 32
+
+
+class SentenceTokenTextSplitter(TextSplitter):
+    """
+    Same windows as langchain's SentenceTransformersTokenTextSplitter, but it only needs the
+    model's tokenizer, taken from the shared model registry: splitters share one tokenizer
+    per process (and /models reports it) instead of each loading the full SentenceTransformer.
+    """
+
+    def __init__(self, tokens_per_chunk: int = 256, chunk_overlap: int = 50,
+                 model_name: str = SENTENCE_MODEL, **kwargs):
+        super().__init__(chunk_size=tokens_per_chunk, chunk_overlap=chunk_overlap, **kwargs)
+        self.model_name = model_name
+        self.tokens_per_chunk = tokens_per_chunk
+        self.tokenizer = get_model_registry().get("tokenizer", model_name)
+        limit = getattr(self.tokenizer, "model_max_length", None)
+        if limit and tokens_per_chunk > limit:
+            raise ValueError(f"The token limit of '{model_name}' is {limit}; tokens_per_chunk={tokens_per_chunk}")
+
+    def _encode(self, text: str) -> List[int]:
+        return self.tokenizer.encode(text, max_length=_NO_TRUNCATION, truncation="do_not_truncate")
+
+    def split_text(self, text: str) -> List[str]:
+        tokenizer = Tokenizer(
+            chunk_overlap=self._chunk_overlap,
+            tokens_per_chunk=self.tokens_per_chunk,
+            decode=self.tokenizer.decode,
+            encode=lambda t: self._encode(t)[1:-1],  # drop the [CLS]/[SEP] ids
+        )
+        return split_text_on_tokens(text=text, tokenizer=tokenizer)
+
+    def count_tokens(self, *, text: str) -> int:
+        return len(self._encode(text))
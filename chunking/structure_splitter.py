@@ -0,0 +1,133 @@
+import re
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+
+# "[specifications]" (an ALL-CAPS header marked by TextCleaner with keep_line_breaks=True)
+# or "key features:" on its own line; a short sentence ending in "." is not a heading
+HEADING_PATTERN = re.compile(r"^(?:\[([a-z0-9][a-z0-9 \-()]{0,60})\]|([a-z0-9][a-z0-9 \-()]{0,60}):)$")
+HEADING_MAX_WORDS = 8
+# spec table / record rows: "weight: 2.5 kg", "in stock: true"
+ROW_PATTERN = re.compile(r"^[a-z0-9][a-z0-9 \-()\[\]]{0,40}: \S")
+LINE_PATTERN = re.compile(r"[^\n]+")
+
+
+class _Block:
+    def __init__(self, kind: str, start: int, end: int, section: Optional[str], content: Optional[str] = None):
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.section = section
+        # text of a fallback-split piece, emitted as is instead of being sliced back out of the source
+        self.content = content
+
+
+class StructureTextSplitter:
+    """
+    Splits cleaned text (TextCleaner with keep_line_breaks=True) on its structure instead of
+    a fixed window: a heading starts a block, consecutive `key: value` rows form one spec
+    table block, and paragraphs end at blank lines. Blocks are packed whole into chunks of
+    at most `chunk_size` tokens; only a block larger than that is cut, at line boundaries,
+    and only a single oversized line goes through the `fallback` token splitter.
+    """
+
+    def __init__(self, chunk_size: int = 256, chars_per_token: float = 4.0, fallback=None):
+        self.max_chars = int(chunk_size * chars_per_token)
+        self.fallback = fallback
+
+    @staticmethod
+    def _kind(line: str) -> str:
+        match = HEADING_PATTERN.match(line)
+        if match and (match.group(1) or len(line.split()) <= HEADING_MAX_WORDS):
+            return "heading"
+        if ROW_PATTERN.match(line):
+            return "row"
+        return "text"
+
+    def segment(self, text: str) -> List[_Block]:
+        blocks = []
+        current = None
+        section = None
+        prev_end = 0
+        for match in LINE_PATTERN.finditer(text):
+            line = match.group().strip()
+            if not line:
+                continue
+            start, end = match.start(), match.end()
+            paragraph_break = text.count("\n", prev_end, start) > 1
+            prev_end = end
+            kind = self._kind(line)
+
+            if kind == "heading":
+                section = line.strip("[]:").strip()
+                current = _Block("heading", start, end, section)
+                blocks.append(current)
+                continue
+            if current is not None and not paragraph_break and (
+                current.kind == "heading"
+                or (kind == "row" and current.kind == "table")
+                or (kind == "text" and current.kind == "text")
+            ):
+                current.kind = "table" if kind == "row" else "text"
+                current.end = end
+                continue
+            current = _Block("table" if kind == "row" else "text", start, end, section)
+            blocks.append(current)
+        return blocks
+
+    def _fit(self, text: str, block: _Block) -> List[_Block]:
+        """Cut an oversized block at line boundaries, falling back to tokens for long lines."""
+        pieces = []
+        for match in LINE_PATTERN.finditer(text, block.start, block.end):
+            start, end = match.start(), match.end()
+            if end - start <= self.max_chars or self.fallback is None:
+                pieces.append(_Block(block.kind, start, end, block.section))
+                continue
+            # token splitters' start_index can be -1 (char-based overlap math), so locate each
+            # piece ourselves and keep its text; it is only an offset hint for the metadata
+            search_from = start
+            for part in self.fallback.split_text(text[start:end]):
+                idx = text.find(part, search_from, end)
+                if idx < 0:
+                    idx = search_from
+                else:
+                    search_from = idx + 1
+                pieces.append(_Block(block.kind, idx, min(end, idx + len(part)), block.section, content=part))
+        return pieces
+
+    def split_text_with_offsets(self, text: str) -> List[Tuple[int, str, Optional[str]]]:
+        """(start offset, chunk text, section) for every chunk of `text`."""
+        chunks = []
+        group: List[_Block] = []
+
+        def flush():
+            if group:
+                start = group[0].start
+                chunks.append((start, text[start:group[-1].end], group[0].section))
+                group.clear()
+
+        for block in self.segment(text):
+            pieces = [block] if block.end - block.start <= self.max_chars else self._fit(text, block)
+            for piece in pieces:
+                if piece.content is not None:
+                    flush()
+                    chunks.append((piece.start, piece.content, piece.section))
+                    continue
+                if group and piece.end - group[0].start > self.max_chars:
+                    flush()
+                group.append(piece)
+        flush()
+        return chunks
+
+    def split_text(self, text: str) -> List[str]:
+        return [chunk for _, chunk, _ in self.split_text_with_offsets(text)]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        out = []
+        for doc in documents:
+            for start, chunk, section in self.split_text_with_offsets(doc.page_content):
+                metadata = dict(doc.metadata or {})
+                metadata["start_index"] = start
+                if section:
+                    metadata["section"] = section
+                out.append(Document(page_content=chunk, metadata=metadata))
+        return out
@@ -0,0 +1,69 @@
+"""
+Throughput benchmark for TextCleaner.clean_text vs the step-by-step reference.
+
+    python -m cleaning.benchmark                       # collectors' raw extraction backups
+    python -m cleaning.benchmark corpus.jsonl --repeat 5
+
+Input files are stage checkpoints (.ckpt) or JSONL with a `page_content` field.
+Reports MB/s of UTF-8 input for both engines and checks that their outputs are identical.
+"""
+import argparse
+import os
+import time
+from typing import List
+
+from cleaning.cleaner import TextCleaner
+from utils.checkpoints import FramedCheckpointStore, JSONLCheckpointStore
+
+DEFAULT_CORPUS = [
+    "collectors/pdf_extracted_backup.ckpt",
+    "collectors/json_extracted_backup.ckpt",
+]
+
+
+def load_corpus(paths: List[str]) -> List[str]:
+    texts = []
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"[BENCH] Skipping missing corpus file: {path}")
+            continue
+        store = FramedCheckpointStore() if path.endswith(FramedCheckpointStore.extension) else JSONLCheckpointStore()
+        texts.extend(record.get("page_content", "") for record in store.iter_records(path))
+    return texts
+
+
+def _run(fn, texts: List[str], repeat: int):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(t) for t in texts]
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TextCleaner.clean_text throughput")
+    parser.add_argument("corpus", nargs="*", default=DEFAULT_CORPUS, help="checkpoint or JSONL files with page_content")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per engine (best is reported)")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus)
+    if not texts:
+        print("[BENCH] No corpus found. Run the pipeline first or pass checkpoint/JSONL files.")
+        return
+    size_mb = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+    cleaner = TextCleaner()
+    cleaner.clean_text("warm up")  # compiles patterns before timing
+
+    ref_s, ref_out = _run(cleaner.clean_text_reference, texts, args.repeat)
+    new_s, new_out = _run(cleaner.clean_text, texts, args.repeat)
+
+    mismatches = sum(1 for a, b in zip(ref_out, new_out) if a != b)
+    print(f"[BENCH] Corpus: {len(texts)} documents, {size_mb:.2f} MB")
+    print(f"[BENCH] reference: {ref_s:.3f}s  {size_mb / ref_s:.2f} MB/s")
+    print(f"[BENCH] fused:     {new_s:.3f}s  {size_mb / new_s:.2f} MB/s  ({ref_s / new_s:.1f}x)")
+    print(f"[BENCH] Output mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
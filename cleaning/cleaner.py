@@ -214,11 +214,124 @@
 
 
 import re
+import os
 import unicodedata
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
 from langchain_core.documents import Document
-import json
-import uuid
+
+from utils.checkpoints import get_checkpoint_store
+from utils.ids import document_id
+from utils.parallel import batched, submit_bounded
+
+CLEAN_WORKERS = int(os.getenv("CLEAN_WORKERS", "1"))
+CLEAN_CHUNK_SIZE = int(os.getenv("CLEAN_CHUNK_SIZE", "64"))
+
+UNICODE_REPLACEMENTS = {
+    '"': '"', "'": "'",  # Smart quotes/apostrophes
+    '–': '-', '—': '-',
+    '…': '...',
+    '«': '"', '»': '"',
+    '°': ' degrees ',
+    '©': '(c)',
+    '®': '(r)',
+    '™': '(tm)',
+}
+
+
+class _CharTable(dict):
+    """
+    Lazily filled str.translate table reproducing clean_text_reference's per-character
+    steps: drop combining marks (Mn), apply UNICODE_REPLACEMENTS, then drop non-printable
+    characters other than newline/tab. None of the replacements feed into each other or
+    produce droppable characters, so one lookup per character is equivalent.
+    """
+
+    def __init__(self, normalize_unicode: bool):
+        super().__init__()
+        self.normalize_unicode = normalize_unicode
+
+    def __missing__(self, cp: int):
+        ch = chr(cp)
+        out = ch
+        if self.normalize_unicode:
+            if unicodedata.category(ch) == 'Mn':
+                out = ''
+            else:
+                out = UNICODE_REPLACEMENTS.get(ch, ch)
+        if out == ch and not ch.isprintable() and ch not in '\n\t':
+            out = ''
+        self[cp] = out
+        return out
+
+
+_CHAR_TABLES = {True: _CharTable(True), False: _CharTable(False)}
+# Everything outside printable ASCII (plus newline/tab) goes through the char table
+_NON_ASCII_RUN = re.compile(r'[^\t\n\x20-\x7e]+')
+
+
+class CleaningStats:
+    """Running totals for get_cleaning_stats, updated as documents stream through."""
+
+    def __init__(self):
+        self.original_count = 0
+        self.cleaned_count = 0
+        self.too_short = 0
+        self.original_chars = 0
+        self.cleaned_chars = 0
+        self.errors: List[dict] = []
+
+    def add_original(self, doc):
+        self.original_count += 1
+        if isinstance(doc, Document):
+            self.original_chars += len(doc.page_content or "")
+
+    def add_cleaned(self, doc: Document):
+        self.cleaned_count += 1
+        self.cleaned_chars += len(doc.page_content)
+
+    def add_error(self, index: int, doc, error: str):
+        meta = (doc.metadata or {}) if isinstance(doc, Document) else {}
+        self.errors.append({
+            "index": index,
+            "doc_id": meta.get("doc_id"),
+            "source": meta.get("source"),
+            "error": error,
+        })
+
+    def as_dict(self) -> dict:
+        removed = self.original_count - self.cleaned_count
+        return {
+            'original_document_count': self.original_count,
+            'cleaned_document_count': self.cleaned_count,
+            'documents_removed': removed,
+            'removal_rate': removed / self.original_count if self.original_count > 0 else 0,
+            'original_total_characters': self.original_chars,
+            'cleaned_total_characters': self.cleaned_chars,
+            'character_reduction_rate': (self.original_chars - self.cleaned_chars) / self.original_chars if self.original_chars > 0 else 0,
+            'documents_too_short': self.too_short,
+            'documents_failed': len(self.errors),
+        }
+
+
+# Per-process cleaner for the pool mode, built once by the pool initializer
+_worker_cleaner = None
+
+
+def _init_worker(options: dict):
+    global _worker_cleaner
+    _worker_cleaner = TextCleaner(**options)
+
+
+def _clean_batch(texts: List[str]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """(cleaned text, error) per input text, so one bad document doesn't fail the batch."""
+    results = []
+    for text in texts:
+        try:
+            results.append((_worker_cleaner.clean_text(text), None))
+        except Exception as e:
+            results.append((None, f"{type(e).__name__}: {e}"))
+    return results
 
 
 class TextCleaner:
@@ -229,7 +342,11 @@ class TextCleaner:
                  remove_urls: bool = True,
                  remove_emails: bool = True,
                  normalize_unicode: bool = True,
-                 backup_path: str = "cleaning/cleaned_docs_backup.jsonl"):  # Added backup path
+                 backup_path: str = "cleaning/cleaned_docs_backup.jsonl",  # Added backup path
+                 workers: int = CLEAN_WORKERS,
+                 chunk_size: int = CLEAN_CHUNK_SIZE,
+                 keep_line_breaks: bool = False,
+                 checkpoints=None):
         self.preserve_structure = preserve_structure
         self.min_sentence_length = min_sentence_length
         self.max_sentence_length = max_sentence_length
@@ -237,6 +354,12 @@ class TextCleaner:
         self.remove_emails = remove_emails
         self.normalize_unicode = normalize_unicode
         self.backup_path = backup_path  # Store backup file path
+        self.checkpoints = checkpoints or get_checkpoint_store()
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.stats = CleaningStats()
+        # Keep line/paragraph breaks for the structure-aware chunker instead of flattening
+        self.keep_line_breaks = keep_line_breaks
         
         # Compile regex patterns for better performance
         self._compile_patterns()
@@ -254,30 +377,30 @@ class TextCleaner:
         self.bullet_pattern = re.compile(r'^[\s]*[•·▪▫◦‣⁃*\-\+]\s*', re.MULTILINE)
         self.numbered_list_pattern = re.compile(r'^[\s]*\d+[\.\)]\s*', re.MULTILINE)
         self.header_pattern = re.compile(r'^[A-Z\s]{3,}$', re.MULTILINE)
+        self.horizontal_space_pattern = re.compile(r'[ \t]+')
+        # One pass for the special-chars substitution plus normalize_spacing: a run of characters
+        # the special-chars pattern would blank out, mixed with spaces/tabs/newlines, becomes a
+        # single space. Other whitespace is kept, exactly as the two-step version does.
+        other_space = ''.join(re.escape(chr(c)) for c in range(0x3001) if chr(c).isspace() and chr(c) not in ' \t\n')
+        self.collapse_pattern = re.compile(r"[^a-zA-Z0-9\.\,\!\?\:\'\"\-\(\)\[\]" + other_space + r"]+")
+        # keep_line_breaks variant: same, but newlines survive and are then trimmed so lines
+        # carry no edge spaces and paragraph breaks are exactly one blank line
+        self.collapse_inline_pattern = re.compile(r"[^a-zA-Z0-9\.\,\!\?\:\'\"\-\(\)\[\]\n" + other_space + r"]+")
+        self.line_break_pattern = re.compile(r' ?\n[ \n]*')
 
     def normalize_unicode_text(self, text: str) -> str:
         if not self.normalize_unicode:
             return text
         text = unicodedata.normalize('NFD', text)
         text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
-        unicode_replacements = {
-            '"': '"', "'": "'",  # Smart quotes/apostrophes
-            '–': '-', '—': '-',
-            '…': '...',
-            '«': '"', '»': '"',
-            '°': ' degrees ',
-            '©': '(c)',
-            '®': '(r)',
-            '™': '(tm)',
-        }
-        for unicode_char, replacement in unicode_replacements.items():
+        for unicode_char, replacement in UNICODE_REPLACEMENTS.items():
             text = text.replace(unicode_char, replacement)
         return text
 
     def remove_unwanted_patterns(self, text: str) -> str:
         if self.remove_urls:
             text = self.url_pattern.sub(' ', text)
-        if self.remove_emails:
+        if self.remove_emails and '@' in text:
             text = self.email_pattern.sub(' ', text)
         text = self.excessive_punct_pattern.sub(r'\1', text)
         return text
@@ -289,6 +412,9 @@ class TextCleaner:
         def header_replacer(match):
             header_text = match.group().strip()
             if len(header_text) > 0:
+                if self.keep_line_breaks:
+                    # keep the header recognisable for StructureTextSplitter: "[specifications]" on its own line
+                    return '[' + ' '.join(header_text.split()) + ']'
                 return header_text.title() + '. '
             return ''
 
@@ -301,12 +427,36 @@ class TextCleaner:
         # Remove semicolons by replacing them with space
         text = text.replace(';', ' ')
         # Normalize horizontal whitespace to single spaces
-        text = re.sub(r'[ \t]+', ' ', text)
+        text = self.horizontal_space_pattern.sub(' ', text)
         return text.strip()
 
     # filter_sentences removed along with calls
 
     def clean_text(self, text: str) -> str:
+        """
+        Fused cleaning engine; output is identical to clean_text_reference (unless
+        keep_line_breaks is set). NFD is skipped
+        for pure-ASCII input, the Mn/replacement/printable filters only touch runs of
+        non-ASCII or control characters (via a cached translation table), and the
+        special-char, newline, semicolon and spacing passes are one collapsing regex.
+        """
+        if not text or not isinstance(text, str):
+            return ""
+        if self.normalize_unicode and not text.isascii():
+            text = unicodedata.normalize('NFD', text)
+        table = _CHAR_TABLES[bool(self.normalize_unicode)]
+        text = _NON_ASCII_RUN.sub(lambda m: m.group().translate(table), text)
+        text = self.remove_unwanted_patterns(text)
+        text = self.clean_structural_elements(text)
+        text = text.lower()
+        if self.keep_line_breaks:
+            text = self.collapse_inline_pattern.sub(' ', text)
+            text = self.line_break_pattern.sub(lambda m: '\n\n' if m.group().count('\n') > 1 else '\n', text)
+            return text.strip()
+        return self.collapse_pattern.sub(' ', text).strip()
+
+    def clean_text_reference(self, text: str) -> str:
+        """Step-by-step cleaning pipeline; kept as the compatibility reference for clean_text."""
         if not text or not isinstance(text, str):
             return ""
         text = self.normalize_unicode_text(text)
@@ -322,43 +472,91 @@ class TextCleaner:
             return ""
         return text
 
-    def clean_documents(self, documents: List[Document]) -> List[Document]:
-        if not documents:
-            return []
-        
-        cleaned_docs = []
-        with open(self.backup_path, "w", encoding="utf-8") as backup_file:
+    def _options(self) -> dict:
+        return {
+            "preserve_structure": self.preserve_structure,
+            "min_sentence_length": self.min_sentence_length,
+            "max_sentence_length": self.max_sentence_length,
+            "remove_urls": self.remove_urls,
+            "remove_emails": self.remove_emails,
+            "normalize_unicode": self.normalize_unicode,
+            "keep_line_breaks": self.keep_line_breaks,
+        }
+
+    def _iter_cleaned(self, documents: Iterable) -> Iterator[Tuple[int, object, Optional[str], Optional[str]]]:
+        """(index, document, cleaned text, error) in input order."""
+        if self.workers <= 1:
             for i, doc in enumerate(documents):
+                if not isinstance(doc, Document):
+                    yield i, doc, None, "not a Document object"
+                    continue
                 try:
-                    if not isinstance(doc, Document):
-                        print(f"Warning: Item {i} is not a Document object, skipping...")
-                        continue
-                    cleaned_text = self.clean_text(doc.page_content)
-                    if cleaned_text and len(cleaned_text.strip()) >= self.min_sentence_length:
-                        new_metadata = doc.metadata.copy() if doc.metadata else {}
-                        new_metadata['cleaned'] = True
-                        new_metadata['original_length'] = len(doc.page_content)
-                        new_metadata['cleaned_length'] = len(cleaned_text)
-                        doc_id = str(uuid.uuid4())
-                        backup_entry = {
-                            "id": doc_id,
-                            "page_content": cleaned_text,
-                            "metadata": new_metadata
-                        }
-                        json.dump(backup_entry, backup_file, ensure_ascii=False)
-                        backup_file.write("\n")
-                        cleaned_docs.append(Document(
-                            page_content=cleaned_text,
-                            metadata=new_metadata
-                        ))
-                    else:
-                        print(f"Warning: Document {i} was too short after cleaning, skipping...")
+                    yield i, doc, self.clean_text(doc.page_content), None
+                except Exception as e:
+                    yield i, doc, None, f"{type(e).__name__}: {e}"
+            return
+
+        # chunk_size documents per task, through a bounded window of tasks in flight
+        def submit(pool, batch):
+            valid = [doc.page_content for _, doc in batch if isinstance(doc, Document)]
+            return pool.submit(_clean_batch, valid) if valid else None
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self._options(),)) as pool:
+            batches = batched(enumerate(documents), self.chunk_size)
+            for batch, future in submit_bounded(pool, batches, submit, self.workers):
+                valid = [i for i, doc in batch if isinstance(doc, Document)]
+                try:
+                    results = dict(zip(valid, future.result())) if future else {}
                 except Exception as e:
-                    print(f"Error cleaning document {i}: {str(e)}")
+                    results = {i: (None, f"{type(e).__name__}: {e}") for i in valid}
+                for i, doc in batch:
+                    if i not in results:
+                        yield i, doc, None, "not a Document object"
+                    else:
+                        yield (i, doc) + results[i]
+
+    def iter_clean_documents(self, documents: Iterable) -> Iterator[Document]:
+        """
+        Stream cleaned Documents in input order, writing the backup JSONL as they go.
+        `documents` may be a generator. Failures are recorded in `self.stats.errors`
+        instead of aborting the run, and `self.stats` is updated per document.
+        """
+        self.stats = stats = CleaningStats()
+        with self.checkpoints.writer(self.backup_path) as backup:
+            for i, doc, cleaned_text, error in self._iter_cleaned(documents):
+                stats.add_original(doc)
+                if error is not None:
+                    stats.add_error(i, doc, error)
                     continue
-        return cleaned_docs
-
-    def get_cleaning_stats(self, original_docs: List[Document], cleaned_docs: List[Document]) -> dict:
+                if not cleaned_text or len(cleaned_text.strip()) < self.min_sentence_length:
+                    stats.too_short += 1
+                    continue
+                new_metadata = doc.metadata.copy() if doc.metadata else {}
+                new_metadata['cleaned'] = True
+                new_metadata['original_length'] = len(doc.page_content)
+                new_metadata['cleaned_length'] = len(cleaned_text)
+                doc_id = document_id(doc, i)
+                new_metadata['doc_id'] = doc_id
+                backup.write(doc_id, cleaned_text, new_metadata)
+                cleaned = Document(page_content=cleaned_text, metadata=new_metadata)
+                stats.add_cleaned(cleaned)
+                yield cleaned
+        print(f"[CLEAN] Cleaned {stats.cleaned_count}/{stats.original_count} documents "
+              f"({stats.too_short} too short, {len(stats.errors)} failed)")
+
+    def clean_documents(self, documents: Iterable[Document]) -> List[Document]:
+        if not documents:
+            return []
+        return list(self.iter_clean_documents(documents))
+
+    def get_cleaning_stats(self, original_docs: Optional[List[Document]] = None,
+                           cleaned_docs: Optional[List[Document]] = None) -> dict:
+        """Stats of the last clean_documents run; pass both lists to recompute from scratch."""
+        if original_docs is None and cleaned_docs is None:
+            return self.stats.as_dict()
+        original_docs = original_docs or []
+        cleaned_docs = cleaned_docs or []
         original_count = len(original_docs)
         cleaned_count = len(cleaned_docs)
         original_total_chars = sum(len(doc.page_content) for doc in original_docs)
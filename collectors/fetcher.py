@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+}
+
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "4"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "3"))
+FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", "collectors/http_cache")
+
+
+class HTTPFetcher:
+    """
+    Shared HTTP layer for the collectors: one pooled session, retries with exponential
+    backoff, a per-host concurrency limit, and conditional GET (ETag / Last-Modified)
+    backed by an on-disk response cache.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = FETCH_CACHE_DIR,
+        max_workers: int = FETCH_WORKERS,
+        per_host_limit: int = FETCH_PER_HOST,
+        retries: int = FETCH_RETRIES,
+        backoff_factor: float = 0.5,
+        timeout=(5, 30),
+        headers: Optional[dict] = None,
+    ):
+        self.cache_dir = cache_dir
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self.headers = dict(headers or HEADERS)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._host_limits.get(host)
+            if sem is None:
+                sem = self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return sem
+
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".body"), os.path.join(self.cache_dir, key + ".json")
+
+    def _cached(self, url: str):
+        if not self.cache_dir:
+            return None, None
+        body_path, meta_path = self._cache_paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                return meta, f.read()
+        except Exception:
+            return None, None
+
+    def _store(self, url: str, response: requests.Response):
+        if not self.cache_dir:
+            return
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        body_path, meta_path = self._cache_paths(url)
+        with open(body_path + ".tmp", "wb") as f:
+            f.write(response.content)
+        os.replace(body_path + ".tmp", body_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+    def fetch(self, url: str) -> bytes:
+        """GET `url`, revalidating a cached copy when one exists. Raises on HTTP errors."""
+        meta, cached_body = self._cached(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        with self._host_limit(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached_body is not None:
+            print(f"[FETCH] Not modified, using cached copy: {url}")
+            return cached_body
+        response.raise_for_status()
+        self._store(url, response)
+        return response.content
+
+    def fetch_many(self, urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """Fetch URLs concurrently; failed URLs map to None (errors are printed)."""
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+
+        def _safe_fetch(url):
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                print(f"[ERROR] Failed to download {url}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            bodies = list(pool.map(_safe_fetch, urls))
+        print(f"[FETCH] Downloaded {sum(b is not None for b in bodies)}/{len(urls)} URLs")
+        return dict(zip(urls, bodies))
+
+    def close(self):
+        self.session.close()
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher() -> HTTPFetcher:
+    """Process-wide fetcher so all collectors share one connection pool and cache."""
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = HTTPFetcher()
+        return _default_fetcher
@@ -109,28 +109,64 @@
 
 
 from pathlib import Path
-from dotenv import load_dotenv
-load_dotenv()
-import requests
+from urllib.parse import urlparse
 import json
-import uuid
 from langchain_core.documents import Document
 import os
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-}
+from typing import Iterator, List, Optional, Tuple
+
+import config  # noqa: F401  (loads .env)
+from collectors.fetcher import HTTPFetcher, get_fetcher
+from collectors.record_spec import RecordSpec, load_record_specs
+from utils.checkpoints import get_checkpoint_store
+from utils.ids import stable_id
+
+try:
+    import ijson  # optional: constant-memory parsing of large top-level JSON arrays
+except ImportError:
+    ijson = None
+
+JSON_EXTENSIONS = (".json", ".jsonl")
 
 class JSONCollector:
-    def __init__(self, backup_path: str = "collectors/json_extracted_backup.jsonl"):
+    def __init__(
+        self,
+        backup_path: str = "collectors/json_extracted_backup.jsonl",
+        fetcher: Optional[HTTPFetcher] = None,
+        record_specs: Optional[List[RecordSpec]] = None,
+        checkpoints=None,
+    ):
         self.backup_path = backup_path
+        self.checkpoints = checkpoints or get_checkpoint_store()
+        self.fetcher = fetcher or get_fetcher()
+        # Feeds matching a spec yield one document per product record instead of one per field
+        self.record_specs = record_specs if record_specs is not None else load_record_specs()
+
+    def _spec_for(self, source: str) -> Optional[RecordSpec]:
+        for spec in self.record_specs:
+            if spec.matches(source):
+                return spec
+        return None
+
+    def _entries_from_data(self, data, spec: Optional[RecordSpec]):
+        if spec is None:
+            return self._extract_texts(data)
+        return [entry for entry in map(spec.build, spec.iter_records(data)) if entry[0]]
+
+    def _entries_from_record(self, record, spec: Optional[RecordSpec]):
+        if spec is None:
+            # Each record is treated like one element of a top-level JSON array
+            return self._extract_texts([record])
+        text, meta = spec.build(record)
+        return [(text, meta)] if text else []
 
     def read_json_file(self, file_path: str):
         try:
             print(f"[INFO] Reading JSON: {file_path}")
             with open(file_path, "r", encoding="utf-8") as file:
                 data = json.load(file)
-            return self._extract_texts(data)
+            return self._entries_from_data(data, self._spec_for(file_path))
         except Exception as e:
             print(f"[ERROR] Failed to read JSON {file_path}: {e}")
             return []
@@ -138,14 +174,98 @@ class JSONCollector:
     def read_json_from_url(self, url: str):
         try:
             print(f"[INFO] Downloading JSON from URL: {url}")
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return self._extract_texts(data)
+            return list(self._iter_json_bytes(url, self.fetcher.fetch(url)))
         except Exception as e:
             print(f"[ERROR] Failed to download/read JSON from URL {url}: {e}")
             return []
 
+    @staticmethod
+    def _is_top_level_array(file_path: str) -> bool:
+        with open(file_path, "rb") as f:
+            head = f.read(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+        return head[:1] == b"["
+
+    def _container_at(self, file_path: str, prefix: str) -> Optional[str]:
+        """
+        "array" or "map" for the container whose members the ijson `prefix` (".item"-terminated)
+        selects, or None if it can't be streamed. A `[*]` over a dict means "all values",
+        as in record_spec.select, so maps are streamed too.
+        """
+        container = prefix[:-len("item")].rstrip(".")
+        if ".item." in f".{container}.":
+            return None  # wildcard before the last step: leave it to read_json_file
+        if not container:
+            with open(file_path, "rb") as f:
+                head = f.read(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+            return {b"[": "array", b"{": "map"}.get(head[:1])
+        with open(file_path, "rb") as f:
+            for path, event, _ in ijson.parse(f):
+                if path == container and event in ("start_array", "start_map"):
+                    return "array" if event == "start_array" else "map"
+        return None
+
+    def _iter_jsonl_lines(self, lines, label: str, spec: Optional[RecordSpec] = None) -> Iterator[Tuple[str, dict]]:
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                print(f"[WARN] Skipping malformed line {line_no} in {label}: {e}")
+                continue
+            yield from self._entries_from_record(record, spec)
+
+    def iter_json_file(self, file_path: str) -> Iterator[Tuple[str, dict]]:
+        """
+        Yield (text, metadata) entries without materializing the whole feed: JSONL is read
+        line by line, and the records of a top-level array or of the feed spec's `records`
+        path (an array, or the values of an object) are parsed incrementally with ijson when
+        it is installed. Other documents fall back to read_json_file.
+        """
+        spec = self._spec_for(file_path)
+        try:
+            if file_path.lower().endswith(".jsonl"):
+                print(f"[INFO] Streaming JSONL: {file_path}")
+                with open(file_path, "r", encoding="utf-8") as file:
+                    yield from self._iter_jsonl_lines(file, file_path, spec)
+                return
+            prefix = spec.ijson_prefix() if spec is not None else "item"
+            if ijson is not None and prefix and (spec is not None or self._is_top_level_array(file_path)):
+                container = self._container_at(file_path, prefix)
+                if container == "array":
+                    print(f"[INFO] Streaming JSON records ({prefix}): {file_path}")
+                    with open(file_path, "rb") as file:
+                        for record in ijson.items(file, prefix, use_float=True):
+                            yield from self._entries_from_record(record, spec)
+                    return
+                if container == "map":
+                    parent = prefix[:-len("item")].rstrip(".")
+                    print(f"[INFO] Streaming JSON records ({parent or '$'} values): {file_path}")
+                    with open(file_path, "rb") as file:
+                        for _, record in ijson.kvitems(file, parent, use_float=True):
+                            yield from self._entries_from_record(record, spec)
+                    return
+        except Exception as e:
+            print(f"[ERROR] Failed to read JSON {file_path}: {e}")
+            return
+        yield from self.read_json_file(file_path)
+
+    def _iter_json_bytes(self, url: str, content) -> Iterator[Tuple[str, dict]]:
+        if content is None:
+            return
+        spec = self._spec_for(urlparse(url).path)
+        if Path(urlparse(url).path).suffix.lower() == ".jsonl":
+            yield from self._iter_jsonl_lines(content.decode("utf-8").splitlines(), url, spec)
+        else:
+            yield from self._entries_from_data(json.loads(content), spec)
+
+    def _extract_fetched(self, url: str, content) -> Iterator[Tuple[str, dict]]:
+        try:
+            yield from self._iter_json_bytes(url, content)
+        except Exception as e:
+            print(f"[ERROR] Failed to download/read JSON from URL {url}: {e}")
+
     def _extract_texts(self, data):
         """
         Extract text content for docs from JSON data structures.
@@ -180,7 +300,7 @@ class JSONCollector:
             print(f"[ERROR] Directory does not exist: {directory_path}")
             return []
         json_files = set()
-        for ext in ("*.json", "*.JSON"):
+        for ext in ("*.json", "*.JSON", "*.jsonl", "*.JSONL"):
             for f in Path(directory_path).glob(ext):
                 if f.is_file():
                     json_files.add(str(f.resolve()).lower())
@@ -189,23 +309,25 @@ class JSONCollector:
             print(f"[ERROR] No JSON files found in directory: {directory_path}")
         return files
 
+    def list_files(self, directory_path: str):
+        """Sorted JSON/JSONL paths under directory_path, in the form load() records as `source`."""
+        return sorted(self._get_json_files_in_directory(directory_path))
+
     def fetch_json_content(self, file_path_or_url: str):
         from urllib.parse import urlparse
         is_url = file_path_or_url.startswith("http://") or file_path_or_url.startswith("https://")
         file_extension = Path(urlparse(file_path_or_url).path).suffix.lower()
 
-        if file_extension not in ['.json']:
+        if file_extension not in JSON_EXTENSIONS:
             print(f"[ERROR] Unsupported file type for JSONCollector: {file_extension}")
             return []
 
         if is_url:
             return self.read_json_from_url(file_path_or_url)
         else:
-            return self.read_json_file(file_path_or_url)
-
-    def load(self, sources):
-        docs = []
+            return self.iter_json_file(file_path_or_url)
 
+    def _resolve_sources(self, sources) -> List[str]:
         print("[DEBUG] Argument received:", sources)
         if isinstance(sources, str):
             print("[DEBUG] Absolute path:", os.path.abspath(sources))
@@ -219,14 +341,14 @@ class JSONCollector:
                 print(f"[VALIDATION] No valid JSON files to process in folder '{sources}'.")
                 return []
 
-        elif isinstance(sources, str) and sources.lower().endswith('.json') and not os.path.isdir(sources):
+        elif isinstance(sources, str) and sources.lower().endswith(JSON_EXTENSIONS) and not os.path.isdir(sources):
             file_list = [sources]
 
         elif isinstance(sources, list):
             seen = set()
             file_list = []
             for item in sources:
-                if isinstance(item, str) and (item.lower().endswith(".json") or item.lower().endswith(".JSON") or item.startswith("http")):
+                if isinstance(item, str) and (item.lower().endswith(JSON_EXTENSIONS) or item.startswith("http")):
                     if item not in seen:
                         file_list.append(item)
                         seen.add(item)
@@ -242,23 +364,59 @@ class JSONCollector:
             print("[VALIDATION] No JSON files found. Aborting JSON extraction.")
             return []
 
+        return file_list
+
+    def iter_documents(self, sources) -> Iterator[Document]:
+        """
+        Yield Documents as they are parsed, appending each one to the backup JSONL as it
+        goes, so memory stays flat in the size of the feed when the caller streams.
+        """
+        file_list = self._resolve_sources(sources)
+        if not file_list:
+            return
+
         print(f"[INFO] JSON files to process: {file_list}")
-        with open(self.backup_path, "w", encoding="utf-8") as backup_file:
+        # download all URLs concurrently up front; local files are streamed in the loop
+        fetched = self.fetcher.fetch_many([
+            f for f in file_list
+            if f.startswith(("http://", "https://")) and Path(urlparse(f).path).suffix.lower() in JSON_EXTENSIONS
+        ])
+        count = 0
+        with self.checkpoints.writer(self.backup_path) as backup:
             for src in file_list:
-                entries = self.fetch_json_content(src)
-                for text, meta in entries:
+                if src in fetched:
+                    entries = self._extract_fetched(src, fetched.pop(src))
+                else:
+                    entries = self.fetch_json_content(src)
+                extension = Path(urlparse(src).path).suffix.lower()
+                # rows repeating a record ID (e.g. the same SKU twice) get the occurrence number
+                # appended, so they don't overwrite each other's chunks in the vector store
+                record_counts = {}
+                duplicates = 0
+                for ordinal, (text, meta) in enumerate(entries):
                     if text:
-                        doc_id = str(uuid.uuid4())
-                        metadata = {"source": src, "file_extension": ".json"}
+                        if "record_id" in meta:
+                            occurrence = record_counts.get(meta["record_id"], 0)
+                            record_counts[meta["record_id"]] = occurrence + 1
+                            if occurrence:
+                                duplicates += 1
+                                doc_id = stable_id(src, "record", meta["record_id"], occurrence)
+                            else:
+                                doc_id = stable_id(src, "record", meta["record_id"])
+                        else:
+                            doc_id = stable_id(src, meta.get("field"), meta.get("subfield"), ordinal)
+                        metadata = {"source": src, "file_extension": extension}
                         metadata.update(meta)
-                        backup_entry = {
-                            "id": doc_id,
-                            "page_content": text,
-                            "metadata": metadata
-                        }
-                        json.dump(backup_entry, backup_file, ensure_ascii=False)
-                        backup_file.write("\n")
-                        docs.append(Document(page_content=text, metadata=metadata))
+                        metadata["doc_id"] = doc_id
+                        backup.write(doc_id, text, metadata)
+                        count += 1
+                        yield Document(page_content=text, metadata=metadata)
+                if duplicates:
+                    print(f"[WARN] {src}: {duplicates} records repeat an earlier record ID; kept them under distinct doc IDs")
+
+        print(f"[INFO] Streamed and backed up {count} JSON documents")
 
+    def load(self, sources):
+        docs = list(self.iter_documents(sources))
         print(f"[INFO] Loaded and backed up {len(docs)} JSON documents")
         return docs
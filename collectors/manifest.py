@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from utils.ids import stable_id
+
+MANIFEST_PATH = os.getenv("SOURCE_MANIFEST_PATH", "collectors/source_manifest.json")
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_id(source: str) -> str:
+    """Stable ID for a source path/URL (independent of its content)."""
+    return stable_id(source)
+
+
+class SourceManifest:
+    """
+    Records path, size, mtime and content hash of every ingested source so a rerun
+    can tell new, modified, unchanged and removed files apart.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self._pending: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            self.entries = {}
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            print(f"[MANIFEST] Failed to read {self.path}, starting empty: {e}")
+            self.entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _stat(self, path: str) -> Optional[dict]:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            print(f"[MANIFEST] Cannot stat {path}: {e}")
+            return None
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    def diff(self, paths: Iterable[str], scope: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        Classify `paths` against the manifest. Size/mtime are checked first and the
+        content hash is only computed when they differ. Entries recorded under the
+        same `scope` that are no longer present are reported as removed.
+        """
+        changes = {"new": [], "modified": [], "unchanged": [], "removed": []}
+        self._pending = {}
+        seen = set()
+        for path in paths:
+            seen.add(path)
+            st = self._stat(path)
+            if st is None:
+                continue
+            old = self.entries.get(path)
+            if old and old["size"] == st["size"] and old["mtime"] == st["mtime"]:
+                changes["unchanged"].append(path)
+                continue
+            content_hash = file_sha256(path)
+            self._pending[path] = {
+                **st,
+                "sha256": content_hash,
+                "source_id": source_id(path),
+                "scope": scope,
+            }
+            if old is None:
+                changes["new"].append(path)
+            elif old["sha256"] == content_hash:
+                # touched but identical content: refresh stat info only
+                changes["unchanged"].append(path)
+            else:
+                changes["modified"].append(path)
+
+        for path, entry in self.entries.items():
+            if path not in seen and (scope is None or entry.get("scope") == scope):
+                changes["removed"].append(path)
+
+        print("[MANIFEST] " + ", ".join(f"{k}={len(v)}" for k, v in changes.items()))
+        return changes
+
+    def metadata_for(self, path: str) -> dict:
+        entry = self._pending.get(path) or self.entries.get(path)
+        if not entry:
+            return {"source_id": source_id(path)}
+        return {"source_id": entry.get("source_id") or source_id(path), "content_hash": entry["sha256"]}
+
+    def commit(self, changes: Dict[str, List[str]]):
+        """Persist the state computed by the last diff() once ingestion succeeded."""
+        for path, entry in self._pending.items():
+            self.entries[path] = entry
+        for path in changes.get("removed", []):
+            self.entries.pop(path, None)
+        self._pending = {}
+        self.save()
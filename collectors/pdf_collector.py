@@ -93,35 +93,73 @@
 
 
 from pathlib import Path
-from dotenv import load_dotenv
-load_dotenv()
-import requests
+from urllib.parse import urlparse
 from io import BytesIO
 from langchain_core.documents import Document
 import PyPDF2
-import json
-import uuid
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config  # noqa: F401  (loads .env)
+from collectors.fetcher import HTTPFetcher, get_fetcher
+from utils.checkpoints import get_checkpoint_store
+from utils.ids import stable_id
+from utils.parallel import submit_bounded
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "1"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "50"))
+PDF_PAGE_LEVEL = os.getenv("PDF_PAGE_LEVEL", "0") == "1"
+
+
+def _join_pages(page_texts) -> str:
+    # Single join instead of repeated `text += page_text` (quadratic on large manuals)
+    return "".join(f"{t}\n" for t in page_texts if t)
+
+
+def _extract_pages(pdf_reader, start: int = 0, end: Optional[int] = None) -> List[str]:
+    return [page.extract_text() or "" for page in pdf_reader.pages[start:end]]
+
+
+def _page_count(file_path: str) -> int:
+    """Process-pool task: number of pages in a local PDF (0 if unreadable)."""
+    try:
+        with open(file_path, "rb") as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        print(f"[ERROR] Failed to read PDF {file_path}: {e}")
+        return 0
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Process-pool task: text of pages [start, end) of a local PDF."""
+    with open(file_path, "rb") as file:
+        return _extract_pages(PyPDF2.PdfReader(file), start, end)
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-}
 
 class PDFCollector:
-    def __init__(self, backup_path: str = "collectors/pdf_extracted_backup.jsonl"):
+    def __init__(
+        self,
+        backup_path: str = "collectors/pdf_extracted_backup.jsonl",
+        workers: int = PDF_WORKERS,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+        page_level: bool = PDF_PAGE_LEVEL,
+        fetcher: Optional[HTTPFetcher] = None,
+        checkpoints=None,
+    ):
         self.backup_path = backup_path
+        self.checkpoints = checkpoints or get_checkpoint_store()
+        self.fetcher = fetcher or get_fetcher()
+        self.workers = workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.page_level = page_level
 
     def read_pdf_file(self, file_path: str) -> str:
         try:
             print(f"[INFO] Reading PDF: {file_path}")
-            text = ""
             with open(file_path, "rb") as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text
+                return _join_pages(_extract_pages(pdf_reader))
         except Exception as e:
             print(f"[ERROR] Failed to read PDF {file_path}: {e}")
             return ""
@@ -129,20 +167,49 @@ class PDFCollector:
     def read_pdf_from_url(self, url: str) -> str:
         try:
             print(f"[INFO] Downloading PDF from URL: {url}")
-            response = requests.get(url, headers=HEADERS, timeout=10)
-            response.raise_for_status()
-            pdf_stream = BytesIO(response.content)
-            pdf_reader = PyPDF2.PdfReader(pdf_stream)
-            text = ""
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-            return text
+            return self.read_pdf_bytes(self.fetcher.fetch(url))
         except Exception as e:
             print(f"[ERROR] Failed to download/read PDF from URL {url}: {e}")
             return ""
 
+    def read_pdf_bytes(self, content: bytes) -> str:
+        return _join_pages(_extract_pages(PyPDF2.PdfReader(BytesIO(content))))
+
+    def read_pdf_files_parallel(self, file_paths: List[str]) -> Dict[str, str]:
+        """
+        Extract local PDFs over a process pool. Files with more than `pages_per_task`
+        pages are split into page ranges so one big manual does not pin a single core;
+        page text is reassembled in page order per file.
+        """
+        if not file_paths:
+            return {}
+        print(f"[INFO] Extracting {len(file_paths)} PDFs with {self.workers} worker processes")
+        pages: Dict[str, List[str]] = {path: [] for path in file_paths}
+        failed = set()
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            counts = list(pool.map(_page_count, file_paths))
+            ranges = (
+                (path, start, min(start + self.pages_per_task, n_pages))
+                for path, n_pages in zip(file_paths, counts)
+                for start in range(0, n_pages, self.pages_per_task)
+            )
+
+            def submit(pool, task):
+                return pool.submit(_extract_page_range, *task)
+
+            # results come back in submission order, so page order is preserved
+            for (path, _, _), future in submit_bounded(pool, ranges, submit, self.workers):
+                try:
+                    pages_text = future.result()
+                except Exception as e:
+                    if path not in failed:
+                        print(f"[ERROR] Failed to read PDF {path}: {e}")
+                    failed.add(path)
+                    continue
+                pages[path].extend(pages_text)
+
+        return {path: "" if path in failed else _join_pages(pages[path]) for path in file_paths}
+
     def fetch_pdf_content(self, file_path_or_url: str) -> str:
         from urllib.parse import urlparse
         is_url = file_path_or_url.startswith("http://") or file_path_or_url.startswith("https://")
@@ -171,14 +238,12 @@ class PDFCollector:
             print(f"[ERROR] No PDF files found in directory: {directory_path}")
         return unique_files
 
+    def list_files(self, directory_path: str):
+        """Sorted PDF paths under directory_path, in the form load() records as `source`."""
+        return sorted(self._get_pdf_files_in_directory(directory_path))
 
-    def load(self, sources):
-        """
-        Loads PDFs from a directory, a single file, or a list of file paths/URLs (no duplicates).
-        Returns list of Document objects and backs up each extraction to a JSONL file.
-        """
-        docs = []
-
+    def _resolve_sources(self, sources) -> List[str]:
+        """Turn a directory, a single file or a list of paths/URLs into a de-duplicated file list."""
         print("[DEBUG] Argument received:", sources)
         if isinstance(sources, str):
             print("[DEBUG] Absolute path:", os.path.abspath(sources))
@@ -218,23 +283,132 @@ class PDFCollector:
             print("[VALIDATION] No PDF files found. Aborting PDF extraction.")
             return []
 
+        return file_list
+
+    def _iter_page_texts(self, file_list: List[str]) -> Iterator[Tuple[str, int, int, str]]:
+        """Yield (source, page_number, page_count, text) one page at a time, in file/page order."""
+        local_files = {f for f in file_list if not f.startswith(("http://", "https://"))}
+        if self.workers > 1 and local_files:
+            parallel = self._iter_page_texts_parallel([f for f in file_list if f in local_files])
+            pending = next(parallel, None)
+        else:
+            parallel, pending = None, None
+
+        for src in file_list:
+            if parallel is not None and src in local_files:
+                while pending is not None and pending[0] == src:
+                    yield pending
+                    pending = next(parallel, None)
+                continue
+            try:
+                if src.startswith(("http://", "https://")):
+                    print(f"[INFO] Downloading PDF from URL: {src}")
+                    pdf_reader = PyPDF2.PdfReader(BytesIO(self.fetcher.fetch(src)))
+                    page_count = len(pdf_reader.pages)
+                    for idx, page in enumerate(pdf_reader.pages):
+                        yield src, idx + 1, page_count, page.extract_text() or ""
+                else:
+                    print(f"[INFO] Reading PDF: {src}")
+                    with open(src, "rb") as file:
+                        pdf_reader = PyPDF2.PdfReader(file)
+                        page_count = len(pdf_reader.pages)
+                        for idx, page in enumerate(pdf_reader.pages):
+                            yield src, idx + 1, page_count, page.extract_text() or ""
+            except Exception as e:
+                print(f"[ERROR] Failed to read PDF {src}: {e}")
+
+    def _iter_page_texts_parallel(self, file_paths: List[str]) -> Iterator[Tuple[str, int, int, str]]:
+        # Page-range tasks go through a bounded window, so memory stays proportional to
+        # workers * pages_per_task rather than to the corpus.
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            counts = list(pool.map(_page_count, file_paths))
+            ranges = (
+                (path, start, min(start + self.pages_per_task, n_pages), n_pages)
+                for path, n_pages in zip(file_paths, counts)
+                for start in range(0, n_pages, self.pages_per_task)
+            )
+
+            def submit(pool, task):
+                return pool.submit(_extract_page_range, *task[:3])
+
+            for (path, start, _, n_pages), future in submit_bounded(pool, ranges, submit, self.workers):
+                try:
+                    texts = future.result()
+                except Exception as e:
+                    print(f"[ERROR] Failed to read pages {start + 1}+ of PDF {path}: {e}")
+                    continue
+                for offset, text in enumerate(texts):
+                    yield path, start + offset + 1, n_pages, text
+
+    def iter_pages(self, sources) -> Iterator[Document]:
+        """
+        Stream one Document per non-empty page, with `page` (1-based) and `page_count`
+        metadata, backing each page up as it is yielded. Peak memory is bounded by a page
+        (or the parallel task window) rather than by whole files.
+        """
+        file_list = self._resolve_sources(sources)
+        if not file_list:
+            return
+        print(f"[INFO] PDF files to stream page by page: {file_list}")
+        count = 0
+        with self.checkpoints.writer(self.backup_path) as backup:
+            for src, page_no, page_count, text in self._iter_page_texts(file_list):
+                if not text:
+                    continue
+                doc_id = stable_id(src, "page", page_no)
+                metadata = {
+                    "source": src,
+                    "file_extension": ".pdf",
+                    "doc_id": doc_id,
+                    "page": page_no,
+                    "page_count": page_count,
+                }
+                backup.write(doc_id, text, metadata)
+                count += 1
+                yield Document(page_content=text, metadata=metadata)
+        print(f"[INFO] Streamed and backed up {count} PDF pages")
+
+    def load(self, sources):
+        """
+        Loads PDFs from a directory, a single file, or a list of file paths/URLs (no duplicates).
+        Returns list of Document objects and backs up each extraction to a JSONL file.
+        With `page_level`, one Document is returned per page (see iter_pages).
+        """
+        if self.page_level:
+            return list(self.iter_pages(sources))
+
+        docs = []
+        file_list = self._resolve_sources(sources)
+        if not file_list:
+            return []
+
         print(f"[INFO] PDF files to process: {file_list}")
-        with open(self.backup_path, "w", encoding="utf-8") as backup_file:
+        extracted = {}
+        if self.workers > 1:
+            local_files = [f for f in file_list if not f.startswith(("http://", "https://"))]
+            extracted = self.read_pdf_files_parallel(local_files)
+        urls = [
+            f for f in file_list
+            if f.startswith(("http://", "https://")) and Path(urlparse(f).path).suffix.lower() == ".pdf"
+        ]
+        for url, content in self.fetcher.fetch_many(urls).items():
+            try:
+                extracted[url] = self.read_pdf_bytes(content) if content else ""
+            except Exception as e:
+                print(f"[ERROR] Failed to read PDF from URL {url}: {e}")
+                extracted[url] = ""
+
+        with self.checkpoints.writer(self.backup_path) as backup:
             for src in file_list:
-                text = self.fetch_pdf_content(src)
+                text = extracted[src] if src in extracted else self.fetch_pdf_content(src)
                 if text:
-                    doc_id = str(uuid.uuid4())
+                    doc_id = stable_id(src)
                     metadata = {
                         "source": src,
                         "file_extension": ".pdf",
+                        "doc_id": doc_id,
                     }
-                    backup_entry = {
-                        "id": doc_id,
-                        "page_content": text,
-                        "metadata": metadata
-                    }
-                    json.dump(backup_entry, backup_file, ensure_ascii=False)
-                    backup_file.write("\n")
+                    backup.write(doc_id, text, metadata)
                     docs.append(Document(page_content=text, metadata=metadata))
         print(f"[INFO] Loaded and backed up {len(docs)} PDF documents")
         return docs
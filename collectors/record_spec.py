@@ -0,0 +1,162 @@
+import fnmatch
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+FEED_SPECS_PATH = os.getenv("FEED_SPECS", "config/feed_specs.json")
+
+_TOKEN = re.compile(r"\.?([^.\[\]]+)|\[(\*|\d+)\]")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _parse_path(path: str) -> List[Any]:
+    """'$.products[*].offers[0].price' -> ['products', '*', 'offers', 0, 'price']"""
+    path = path.strip()
+    if path.startswith("$"):
+        path = path[1:]
+    steps = []
+    for key, index in _TOKEN.findall(path):
+        if key:
+            steps.append(key)
+        elif index == "*":
+            steps.append("*")
+        else:
+            steps.append(int(index))
+    return steps
+
+
+def select(data: Any, path: str) -> List[Any]:
+    """Minimal JSONPath subset: `$`, `.key`, `[n]` and `[*]` (wildcard over list items)."""
+    current = [data]
+    for step in _parse_path(path):
+        nxt = []
+        for node in current:
+            if step == "*":
+                if isinstance(node, list):
+                    nxt.extend(node)
+                elif isinstance(node, dict):
+                    nxt.extend(node.values())
+            elif isinstance(step, int):
+                if isinstance(node, list) and -len(node) <= step < len(node):
+                    nxt.append(node[step])
+            elif isinstance(node, dict) and step in node:
+                nxt.append(node[step])
+        current = nxt
+    return current
+
+
+def _coerce(value: Any, kind: str):
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    try:
+        if kind == "float":
+            if isinstance(value, str):
+                match = _NUMBER.search(value.replace(",", ""))
+                return float(match.group()) if match else None
+            return float(value)
+        if kind == "int":
+            if isinstance(value, str):
+                match = _NUMBER.search(value.replace(",", ""))
+                return int(float(match.group())) if match else None
+            return int(value)
+        if kind == "bool":
+            if isinstance(value, str):
+                return value.strip().lower() in ("1", "true", "yes", "y", "in stock")
+            return bool(value)
+        return str(value).strip() or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_text(values: List[Any]) -> str:
+    parts = []
+    for v in values:
+        if isinstance(v, list):
+            parts.append(", ".join(str(x) for x in v if isinstance(x, (str, int, float))))
+        elif isinstance(v, dict):
+            parts.append("; ".join(f"{k}: {x}" for k, x in v.items() if isinstance(x, (str, int, float))))
+        elif v is not None:
+            parts.append(str(v))
+    return ", ".join(p for p in parts if p)
+
+
+class RecordSpec:
+    """
+    Field mapping for one feed: where the product records live, which fields make up
+    the document text, and which fields become typed metadata (price, brand, sku, ...).
+    """
+
+    def __init__(
+        self,
+        match: str = "*",
+        records: str = "$[*]",
+        text_fields: Optional[List[str]] = None,
+        metadata: Optional[Dict[str, dict]] = None,
+        id_field: Optional[str] = None,
+    ):
+        self.match = match.lower()
+        self.records = records
+        self.text_fields = text_fields or []
+        self.metadata = metadata or {}
+        self.id_field = id_field
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RecordSpec":
+        return cls(
+            match=data.get("match", "*"),
+            records=data.get("records", "$[*]"),
+            text_fields=data.get("text_fields"),
+            metadata=data.get("metadata"),
+            id_field=data.get("id_field"),
+        )
+
+    def matches(self, source: str) -> bool:
+        return fnmatch.fnmatch(Path(source).name.lower(), self.match)
+
+    def ijson_prefix(self) -> Optional[str]:
+        """ijson prefix equivalent of `records` when it is a plain key/[*] path, else None."""
+        steps = _parse_path(self.records)
+        if not steps or steps[-1] != "*" or any(isinstance(s, int) for s in steps):
+            return None
+        return ".".join("item" if s == "*" else s for s in steps)
+
+    def iter_records(self, data: Any) -> Iterator[Any]:
+        yield from select(data, self.records)
+
+    def build(self, record: Any) -> Tuple[str, dict]:
+        """One product record -> (document text, typed metadata)."""
+        if not isinstance(record, dict):
+            return (str(record) if isinstance(record, str) else "", {})
+        lines = []
+        for field in self.text_fields:
+            value = _as_text(select(record, field))
+            if value:
+                keys = [step for step in _parse_path(field) if isinstance(step, str) and step != "*"]
+                lines.append(f"{keys[-1] if keys else field}: {value}")
+        meta = {}
+        for name, rule in self.metadata.items():
+            values = select(record, rule.get("path", name))
+            coerced = _coerce(values[0], rule.get("type", "str")) if values else None
+            if coerced is not None:
+                meta[name] = coerced
+        if self.id_field:
+            ids = select(record, self.id_field)
+            if ids and ids[0] is not None:
+                meta["record_id"] = str(ids[0])
+        return "\n".join(lines), meta
+
+
+def load_record_specs(path: str = FEED_SPECS_PATH) -> List[RecordSpec]:
+    if not path or not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        specs = [RecordSpec.from_dict(feed) for feed in data.get("feeds", [])]
+        print(f"[INFO] Loaded {len(specs)} feed record specs from {path}")
+        return specs
+    except Exception as e:
+        print(f"[ERROR] Failed to read feed specs {path}: {e}")
+        return []
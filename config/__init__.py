@@ -0,0 +1,16 @@
+"""
+Single configuration loading point: importing `config` loads `.env` once into the
+environment. Entry points (main.py, backend.py) import it before anything else so
+module-level os.getenv() defaults everywhere see the same values.
+"""
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:  # python-dotenv is optional; plain environment variables still work
+    load_dotenv = None
+
+ENV_FILE = os.getenv("ENV_FILE") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
+
+if load_dotenv is not None:
+    load_dotenv(ENV_FILE)
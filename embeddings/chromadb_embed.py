@@ -1,7 +1,13 @@
-from typing import List
+from typing import Iterable
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
 import os
+import time
+
+from utils.ids import stable_id
+from utils.parallel import batched
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
 
 class ChromaDBEmbedder:
 
@@ -11,30 +17,105 @@ class ChromaDBEmbedder:
         # Initialize vector store, persistent on disk
         os.makedirs(self.persist_directory, exist_ok=True)
         self.vectorstore = None
+        self.collection_name = None
+
+    def open_collection(self, embedder, collection_name: str = "rag_collection", refresh: bool = False):
+        """
+        Open (or reuse the already open) collection, so writers and readers share one client.
+        `refresh` reopens it from disk to pick up what another process persisted since.
+        """
+        if self.vectorstore is not None and self.collection_name == collection_name and not refresh:
+            return self.vectorstore
+        from langchain_community.vectorstores import Chroma  # deferred: pulls in chromadb
+
+        self.collection_name = collection_name
+        self.vectorstore = Chroma(
+            collection_name=collection_name,
+            embedding_function=embedder.embedder,
+            persist_directory=self.persist_directory
+        )
+        return self.vectorstore
 
-    def store_embeddings(self, embedder, documents: List[Document], collection_name: str = "rag_collection"):
+    @staticmethod
+    def _vector_id(doc: Document) -> str:
+        meta = doc.metadata or {}
+        return meta.get("chunk_id") or stable_id(meta.get("doc_id") or meta.get("source", ""), doc.page_content)
 
-        if not documents:
+    def store_embeddings(
+        self,
+        embedder,
+        documents: Iterable[Document],
+        collection_name: str = "rag_collection",
+        batch_size: int = EMBED_BATCH_SIZE,
+        workers: int = EMBED_WORKERS,
+    ):
+        """
+        Embed each chunk exactly once, batch by batch, and upsert the vectors straight into
+        the collection under their deterministic chunk ids, so re-ingesting the same corpus
+        keeps the collection at corpus size. Only one batch of texts/vectors is held in
+        memory at a time, so `documents` may be a generator.
+        """
+        if documents is None:
             print("[CHROMADB] No documents to embed/store.")
             return None
 
+        pool_started = False
         try:
-            texts = [doc.page_content for doc in documents]
-            metadatas = [doc.metadata for doc in documents]
-            embeddings = embedder.embedder.embed_documents(texts)
-
-            self.vectorstore = Chroma.from_documents(
-                documents=[Document(page_content=text, metadata=meta) for text, meta in zip(texts, metadatas)],
-                embedding=embedder.embedder,
-                collection_name=collection_name,
-                persist_directory=self.persist_directory
-            )
-
-            print(f"[CHROMADB] Stored {len(texts)} embeddings in Chroma collection '{collection_name}'")
+            self.open_collection(embedder, collection_name)
+            collection = self.vectorstore._collection
+            pool_started = embedder.start_pool(workers)
+
+            stored = 0
+            start = time.perf_counter()
+            for batch in batched(documents, max(1, batch_size)):
+                # last occurrence wins if a batch repeats an id; upsert rejects duplicates
+                by_id = {self._vector_id(doc): doc for doc in batch}
+                ids = list(by_id)
+                texts = [doc.page_content for doc in by_id.values()]
+                metadatas = [doc.metadata for doc in by_id.values()]
+                embeddings = embedder.embed_texts(texts)
+                collection.upsert(
+                    ids=ids,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    documents=texts,
+                )
+                stored += len(ids)
+
+            if stored == 0:
+                print("[CHROMADB] No documents to embed/store.")
+                return None
+            if hasattr(self.vectorstore, "persist"):
+                self.vectorstore.persist()
+
+            elapsed = time.perf_counter() - start
+            print(f"[CHROMADB] Stored {stored} embeddings in Chroma collection '{collection_name}' "
+                  f"in {elapsed:.1f}s (batch_size={batch_size}, workers={workers if pool_started else 1})")
             return self.vectorstore
         except Exception as e:
             print(f"[CHROMADB] Failed to store embeddings: {e}")
             return None
+        finally:
+            if pool_started:
+                embedder.stop_pool()
+
+    def delete_sources(self, embedder, sources: Iterable[str], collection_name: str = "rag_collection") -> int:
+        """Remove every vector whose `source` metadata matches one of `sources`."""
+        sources = list(sources)
+        if not sources:
+            return 0
+        try:
+            self.open_collection(embedder, collection_name)
+            collection = self.vectorstore._collection
+            for src in sources:
+                collection.delete(where={"source": src})
+            if hasattr(self.vectorstore, "persist"):
+                self.vectorstore.persist()
+            print(f"[CHROMADB] Deleted vectors for {len(sources)} sources from '{collection_name}'")
+            return len(sources)
+        except Exception as e:
+            print(f"[CHROMADB] Failed to delete sources: {e}")
+            return 0
 
     def similarity_search(self, query: str, embedder, k: int = 5):
         if self.vectorstore is None:
@@ -1,29 +1,110 @@
-from typing import List
+import inspect
+import json
+from typing import List, Optional
 from langchain_core.documents import Document
 
-from langchain_huggingface import HuggingFaceEmbeddings
+from embeddings.embedding_cache import EmbeddingCache, get_embedding_cache, text_hash
+from utils.model_registry import get_model_registry
 
 class Embedder:
 
 
-    def __init__(self, model_name: str = "sentence-transformers/all-MiniLM-L6-v2", device: str = "cpu"):
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        device: str = "cpu",
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+    ):
         self.model_name = model_name
         self.device = device
         self.embedder = self._load_embedder(model_name, device)
+        self.encode_kwargs = dict(getattr(self.embedder, "encode_kwargs", None) or {})
+        # encode options such as normalize_embeddings change the vectors, so they are part of the cache key
+        self.cache_key = model_name
+        if self.encode_kwargs:
+            self.cache_key += "?" + json.dumps(self.encode_kwargs, sort_keys=True, default=str)
+        if not use_cache:
+            self.cache = None
+        else:
+            self.cache = cache if cache is not None else get_embedding_cache()
+        self._pool = None
 
     def _load_embedder(self, model_name: str, device: str):
+        # Shared through the model registry: every Embedder of the same model/device
+        # in this process reuses one set of weights.
         try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name=model_name,
-                model_kwargs={'device': device}
-            )
-            print(f"[EMBEDDER] Loaded model {model_name} on device {device}")
-            return embeddings
+            return get_model_registry().get("embedding", model_name, device)
         except Exception as e:
             print(f"[EMBEDDER] Failed to load embedding model: {e}")
             raise
 
 
+    def _sentence_transformer(self):
+        # langchain_huggingface keeps the model in `_client`, langchain_community in `client`
+        return getattr(self.embedder, "_client", None) or getattr(self.embedder, "client", None)
+
+    def start_pool(self, workers: int) -> bool:
+        """Start sentence-transformers multi-process workers (CPU only). Returns True if a pool is running."""
+        if self._pool is not None:
+            return True
+        model = self._sentence_transformer()
+        if workers <= 1 or self.device != "cpu" or model is None:
+            return False
+        try:
+            self._pool = model.start_multi_process_pool(target_devices=["cpu"] * workers)
+            print(f"[EMBEDDER] Started {workers} embedding worker processes")
+            return True
+        except Exception as e:
+            print(f"[EMBEDDER] Failed to start worker pool, embedding in-process: {e}")
+            self._pool = None
+            return False
+
+    def stop_pool(self):
+        if self._pool is None:
+            return
+        try:
+            self._sentence_transformer().stop_multi_process_pool(self._pool)
+        finally:
+            self._pool = None
+
+    def embed_texts(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """
+        Embed raw strings. Vectors found in the embedding cache are reused; only the
+        misses are computed (over the worker pool when one is running) and stored back.
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return self._compute(texts, batch_size)
+
+        hashes = [text_hash(t) for t in texts]
+        found = self.cache.get_many(self.cache_key, hashes)
+        miss_hashes, miss_texts, pending = [], [], set()
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in pending:
+                pending.add(h)
+                miss_hashes.append(h)
+                miss_texts.append(t)
+        if miss_texts:
+            computed = self._compute(miss_texts, batch_size)
+            self.cache.put_many(self.cache_key, miss_hashes, computed)
+            found.update(zip(miss_hashes, computed))
+        print(f"[EMBEDDER] Cache hits {len(texts) - len(miss_texts)}/{len(texts)}, computed {len(miss_texts)}")
+        return [found[h] for h in hashes]
+
+    def _compute(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        if self._pool is not None:
+            # same input as HuggingFaceEmbeddings.embed_documents: newlines flattened, its encode_kwargs
+            model = self._sentence_transformer()
+            accepted = inspect.signature(model.encode_multi_process).parameters
+            kwargs = {k: v for k, v in self.encode_kwargs.items() if k in accepted}
+            kwargs.setdefault("batch_size", batch_size)
+            texts = [t.replace("\n", " ") for t in texts]
+            vectors = model.encode_multi_process(texts, self._pool, **kwargs)
+            return vectors.tolist()
+        return self.embedder.embed_documents(texts)
+
     def embed_documents(self, documents: List[Document]) -> List[dict]:
 
         if not documents:
@@ -31,7 +112,7 @@ class Embedder:
         try:
             texts = [doc.page_content for doc in documents]
             metadatas = [doc.metadata for doc in documents]
-            embeddings = self.embedder.embed_documents(texts)
+            embeddings = self.embed_texts(texts)
             results = []
             for emb, meta, text in zip(embeddings, metadatas, texts):
                 results.append({
@@ -113,9 +113,10 @@
 
 
 
+import asyncio
 import os
-from dotenv import load_dotenv
-load_dotenv()
+
+import config  # noqa: F401  (loads .env before any module reads its settings)
 
 from embeddings.embedder import Embedder
 from embeddings.chromadb_embed import ChromaDBEmbedder
@@ -129,7 +130,16 @@ CROSSENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 POOL_K = int(os.getenv("RETRIEVER_POOL_K", "60"))
 TOP_K = int(os.getenv("RETRIEVER_TOP_K", "5"))
 
-def main():
+async def _stream_answer(crc: CRC, question: str, history: list) -> dict:
+    """Print answer tokens as they arrive; returns the final invoke()-style result."""
+    async for event in crc.astream(question, history):
+        if event["type"] == "token":
+            print(event["content"], end="", flush=True)
+        else:
+            return event
+
+
+async def amain():
     print("[PIPELINE] Starting data collection pipeline...")
 
     embedder = Embedder()
@@ -148,16 +158,19 @@ def main():
         top_k=TOP_K,
     )
 
+    # One event loop for the whole session, so the LLM clients pooled for it are reused every turn
+    loop = asyncio.get_running_loop()
     chat_history = []
     print("\n[CHAT] Ask your shopping questions. Type 'exit' to quit.\n")
     while True:
-        user_q = input("Enter your query: ").strip()
+        user_q = (await loop.run_in_executor(None, input, "Enter your query: ")).strip()
         if user_q.lower() in {"exit", "quit"}:
             print("[CHAT] Bye.")
             break
 
-        out = crc.invoke(question=user_q, history=chat_history)
-        print("\n[ANSWER]\n", out["answer"])
+        print("\n[ANSWER]\n", end=" ", flush=True)
+        out = await _stream_answer(crc, user_q, chat_history)
+        print()
         print("\n[SOURCES]")
         if out["docs"]:
             for i, d in enumerate(out["docs"]):
@@ -168,5 +181,8 @@ def main():
         chat_history.append({"role": "user", "content": user_q})
         chat_history.append({"role": "assistant", "content": out["answer"]})
 
+def main():
+    asyncio.run(amain())
+
 if __name__ == "__main__":
     main()
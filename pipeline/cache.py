@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+PIPELINE_CACHE_PATH = os.getenv("PIPELINE_CACHE_PATH", "pipeline_state/pipeline_cache.sqlite")
+PIPELINE_CACHE_MAX_MB = float(os.getenv("PIPELINE_CACHE_MAX_MB", "256"))
+PIPELINE_CACHE_DISK_MB = float(os.getenv("PIPELINE_CACHE_DISK_MB", "2048"))
+PIPELINE_CACHE_TTL = float(os.getenv("PIPELINE_CACHE_TTL", str(24 * 3600)))
+# Stages worth keeping; raw pdf_docs/json_docs are dropped unless listed here
+PIPELINE_CACHE_STAGES = os.getenv("PIPELINE_CACHE_STAGES", "cleaned_docs,chunked_docs")
+
+DOC_STAGES = ("pdf_docs", "json_docs", "cleaned_docs", "chunked_docs")
+_SQL_BATCH = 500
+
+
+def _doc_size(page_content: str, metadata_json: str) -> int:
+    return len(page_content.encode("utf-8")) + len(metadata_json)
+
+
+class PipelineCache:
+    """
+    Per-data_dir pipeline outputs for the sample endpoints and incremental merges.
+    SQLite is the shared store, so every uvicorn worker sees the last run; each worker
+    keeps a byte-bounded LRU of recently read stages in memory on top of it. Entries
+    expire after `ttl` seconds and the database itself is trimmed LRU past `disk_bytes`.
+    Only `stages` are cached; the other document lists are dropped.
+    """
+
+    def __init__(
+        self,
+        path: str = PIPELINE_CACHE_PATH,
+        max_bytes: int = int(PIPELINE_CACHE_MAX_MB * 1e6),
+        disk_bytes: int = int(PIPELINE_CACHE_DISK_MB * 1e6),
+        ttl: float = PIPELINE_CACHE_TTL,
+        stages: Optional[List[str]] = None,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+        if stages is None:
+            stages = [s.strip() for s in PIPELINE_CACHE_STAGES.split(",") if s.strip()]
+        self.stages = [s for s in stages if s in DOC_STAGES]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (data_dir, stage) -> (updated_at, size, docs)
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[float, int, List[Document]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " data_dir TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (data_dir, stage))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " data_dir TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " ord INTEGER NOT NULL,"
+            " page_content TEXT NOT NULL,"
+            " metadata TEXT NOT NULL,"
+            " PRIMARY KEY (data_dir, stage, ord))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " data_dir TEXT PRIMARY KEY,"
+            " info TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    # memory tier
+
+    def _remember_locked(self, key: Tuple[str, str], updated_at: float, size: int, docs: List[Document]):
+        old = self._memory.pop(key, None)
+        if old:
+            self._memory_bytes -= old[1]
+        if size > self.max_bytes:
+            return  # larger than the whole budget: serve from SQLite only
+        self._memory[key] = (updated_at, size, docs)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_bytes and self._memory:
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self.evictions += 1
+
+    def _forget_locked(self, data_dir: str):
+        for key in [k for k in self._memory if k[0] == data_dir]:
+            self._memory_bytes -= self._memory.pop(key)[1]
+
+    # shared tier
+
+    def _expire_locked(self):
+        cutoff = time.time() - self.ttl
+        expired = [r[0] for r in self._conn.execute(
+            "SELECT DISTINCT data_dir FROM entries WHERE updated_at < ?", (cutoff,)
+        )]
+        for data_dir in expired:
+            self._delete_locked(data_dir)
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        while total > self.disk_bytes:
+            row = self._conn.execute(
+                "SELECT data_dir, stage, size FROM entries ORDER BY last_used ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM docs WHERE data_dir = ? AND stage = ?", row[:2])
+            self._conn.execute("DELETE FROM entries WHERE data_dir = ? AND stage = ?", row[:2])
+            old = self._memory.pop(row[:2], None)
+            if old:
+                self._memory_bytes -= old[1]
+            total -= row[2]
+            self.evictions += 1
+        if expired:
+            print(f"[PIPELINE-CACHE] Expired cached runs for {len(expired)} data dirs")
+
+    def _delete_locked(self, data_dir: str):
+        self._conn.execute("DELETE FROM docs WHERE data_dir = ?", (data_dir,))
+        self._conn.execute("DELETE FROM entries WHERE data_dir = ?", (data_dir,))
+        self._conn.execute("DELETE FROM runs WHERE data_dir = ?", (data_dir,))
+        self._forget_locked(data_dir)
+
+    def put(self, data_dir: str, entry: dict):
+        """Replace the cached run for `data_dir`: document stages plus JSON-able extras (stats, ...)."""
+        now = time.time()
+        with self._lock:
+            self._delete_locked(data_dir)
+            for stage in self.stages:
+                docs = entry.get(stage) or []
+                rows = [
+                    (data_dir, stage, i, doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False))
+                    for i, doc in enumerate(docs)
+                ]
+                size = sum(_doc_size(r[3], r[4]) for r in rows)
+                for i in range(0, len(rows), _SQL_BATCH):
+                    self._conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?)", rows[i:i + _SQL_BATCH])
+                self._conn.execute(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?)", (data_dir, stage, size, now, now)
+                )
+                self._remember_locked((data_dir, stage), now, size, list(docs))
+            info = {k: v for k, v in entry.items() if k not in DOC_STAGES}
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?)",
+                (data_dir, json.dumps(info, ensure_ascii=False, default=str), now),
+            )
+            self._expire_locked()
+            self._conn.commit()
+
+    def get_docs(self, data_dir: str, stage: str, limit: Optional[int] = None) -> Optional[List[Document]]:
+        """Cached documents of one stage (first `limit` only, if given), or None if not cached."""
+        key = (data_dir, stage)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at, size FROM entries WHERE data_dir = ? AND stage = ?", key
+            ).fetchone()
+            if row is None or row[0] < time.time() - self.ttl:
+                self.misses += 1
+                return None
+            updated_at, size = row
+            self._conn.execute(
+                "UPDATE entries SET last_used = ? WHERE data_dir = ? AND stage = ?", (time.time(), *key)
+            )
+            self._conn.commit()
+
+            cached = self._memory.get(key)
+            if cached and cached[0] == updated_at:
+                # another worker may have rewritten the entry; the timestamp check catches that
+                self._memory.move_to_end(key)
+                self.hits += 1
+                docs = cached[2]
+                return docs[:limit] if limit is not None else list(docs)
+
+            self.misses += 1
+            sql = "SELECT page_content, metadata FROM docs WHERE data_dir = ? AND stage = ? ORDER BY ord"
+            params = list(key)
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(limit)
+            docs = [
+                Document(page_content=content, metadata=json.loads(metadata))
+                for content, metadata in self._conn.execute(sql, params)
+            ]
+            if limit is None:
+                self._remember_locked(key, updated_at, size, docs)
+                return list(docs)
+            return docs
+
+    def get(self, data_dir: str) -> Optional[dict]:
+        """The whole cached run for `data_dir` (cached stages plus extras), or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT info, updated_at FROM runs WHERE data_dir = ?", (data_dir,)).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        entry = json.loads(row[0])
+        for stage in self.stages:
+            entry[stage] = self.get_docs(data_dir, stage) or []
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            disk_bytes, entries = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries"
+            ).fetchone()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total > 0 else 0,
+                "evictions": self.evictions,
+                "memory_bytes": self._memory_bytes,
+                "memory_entries": len(self._memory),
+                "max_memory_bytes": self.max_bytes,
+                "disk_bytes": disk_bytes,
+                "disk_entries": entries,
+                "max_disk_bytes": self.disk_bytes,
+                "stages": self.stages,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
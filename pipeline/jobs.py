@@ -0,0 +1,69 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+PIPELINE_JOB_WORKERS = 1
+
+
+class JobManager:
+    """
+    Runs pipeline jobs on a background thread and keeps their status, so HTTP handlers
+    return a job ID right away. `fn(progress, ...)` gets a callback it can use to report
+    (stage, status, done, total).
+    """
+
+    def __init__(self, max_workers: int = PIPELINE_JOB_WORKERS, keep: int = 100):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+        self._jobs: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.keep = keep
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _forget_old(self):
+        finished = [j for j in self._jobs.values() if j["status"] in ("succeeded", "failed")]
+        for job in sorted(finished, key=lambda j: j["created_at"])[:max(0, len(self._jobs) - self.keep)]:
+            self._jobs.pop(job["job_id"], None)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._forget_old()
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "stage": None,
+                "stages_done": 0,
+                "stages_total": 0,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+
+        def progress(stage: str, status: str, done: int, total: int):
+            self._update(job_id, stage=f"{stage}:{status}", stages_done=done, stages_total=total)
+
+        def run():
+            self._update(job_id, status="running", started_at=time.time())
+            try:
+                result = fn(progress, *args, **kwargs)
+                self._update(job_id, status="succeeded", result=result, finished_at=time.time())
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status="failed", error=f"{type(e).__name__}: {e}", finished_at=time.time())
+
+        self._executor.submit(run)
+        print(f"[JOBS] Queued pipeline job {job_id}")
+        return job_id
+
+    def status(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
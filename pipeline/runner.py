@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional
+
+try:
+    import fcntl  # POSIX only; elsewhere runs are serialized per process
+except ImportError:
+    fcntl = None
+
+from utils.checkpoints import get_checkpoint_store
+from utils.ids import stable_id
+
+PIPELINE_STATE_DIR = os.getenv("PIPELINE_STATE_DIR", "pipeline_state")
+
+_process_lock = threading.Lock()
+
+
+@contextmanager
+def pipeline_lock(state_dir: str = PIPELINE_STATE_DIR):
+    """
+    Held for a whole pipeline run. An flock on `state_dir`/pipeline.lock serializes runs
+    across uvicorn workers, which share the source manifest, the stage checkpoints and
+    the Chroma collection.
+    """
+    with _process_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(state_dir, exist_ok=True)
+        with open(os.path.join(state_dir, "pipeline.lock"), "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class Stage:
+    """
+    One node of the pipeline DAG. `fn(inputs)` receives the output documents of `deps`
+    keyed by stage name and returns (documents, info dict). `fingerprint` covers
+    everything else the output depends on (source hashes, stage config). Stages with
+    side effects outside the checkpoint (e.g. writing to the vector store) should set
+    `cacheable=False` so they run on every pass.
+    """
+
+    def __init__(self, name: str, fn: Callable, deps: Iterable[str] = (), fingerprint: str = "",
+                 cacheable: bool = True):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.fingerprint = fingerprint
+        self.cacheable = cacheable
+
+
+class StageResult:
+    def __init__(self, key: str, docs: list, info: dict, skipped: bool):
+        self.key = key
+        self.docs = docs
+        self.info = info
+        self.skipped = skipped
+
+
+class PipelineRunner:
+    """
+    Runs stages in dependency order. Each stage's output is keyed by a hash of its
+    fingerprint and its dependencies' keys and checkpointed under `state_dir`; a stage
+    whose key already has a completed checkpoint is loaded instead of re-run, so a
+    rerun after a crash resumes at the stage that failed.
+    """
+
+    def __init__(self, stages: List[Stage], state_dir: str = PIPELINE_STATE_DIR, checkpoints=None,
+                 progress: Optional[Callable] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_dir = state_dir
+        self.checkpoints = checkpoints or get_checkpoint_store()
+        self.progress = progress
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def order(self) -> List[Stage]:
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        for name, deps in remaining.items():
+            missing = deps - set(self.stages)
+            if missing:
+                raise ValueError(f"Stage '{name}' depends on unknown stages: {sorted(missing)}")
+        ordered = []
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Pipeline stages form a cycle: {sorted(remaining)}")
+            for name in ready:
+                ordered.append(self.stages[name])
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return ordered
+
+    def _paths(self, stage: Stage, key: str):
+        base = os.path.join(self.state_dir, f"{stage.name}-{key}")
+        return base + ".jsonl", base + ".done.json"
+
+    def _prune(self, stage: Stage, key: str):
+        # only the latest output of a stage is needed to resume
+        prefix = f"{stage.name}-"
+        for name in os.listdir(self.state_dir):
+            if name.startswith(prefix) and not name.startswith(prefix + key):
+                try:
+                    os.remove(os.path.join(self.state_dir, name))
+                except OSError:
+                    pass
+
+    def _report(self, stage: Stage, status: str, done: int, total: int):
+        if self.progress:
+            self.progress(stage.name, status, done, total)
+
+    def run(self, force: bool = False) -> Dict[str, StageResult]:
+        """Run the DAG; with `force`, every stage runs even if a completed checkpoint exists."""
+        ordered = self.order()
+        results: Dict[str, StageResult] = {}
+        for done, stage in enumerate(ordered):
+            key = stable_id(stage.name, stage.fingerprint, *(results[d].key for d in stage.deps))
+            data_path, done_path = self._paths(stage, key)
+
+            if not force and stage.cacheable and os.path.exists(done_path):
+                with open(done_path, "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                docs = list(self.checkpoints.iter_documents(data_path))
+                results[stage.name] = StageResult(key, docs, info, skipped=True)
+                print(f"[PIPELINE] {stage.name}: inputs unchanged, reusing {len(docs)} documents")
+                self._report(stage, "skipped", done + 1, len(ordered))
+                continue
+
+            self._report(stage, "running", done, len(ordered))
+            start = time.perf_counter()
+            docs, info = stage.fn({d: results[d].docs for d in stage.deps})
+            docs = list(docs or [])
+            info = dict(info or {})
+            with self.checkpoints.writer(data_path) as writer:
+                for i, doc in enumerate(docs):
+                    meta = doc.metadata or {}
+                    writer.write(meta.get("chunk_id") or meta.get("doc_id") or stable_id(key, i), doc.page_content, meta)
+            tmp_path = done_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(info, f, ensure_ascii=False)
+            os.replace(tmp_path, done_path)
+            self._prune(stage, key)
+
+            results[stage.name] = StageResult(key, docs, info, skipped=False)
+            print(f"[PIPELINE] {stage.name}: {len(docs)} documents in {time.perf_counter() - start:.1f}s")
+            self._report(stage, "done", done + 1, len(ordered))
+        return results
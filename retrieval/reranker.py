@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from utils.model_registry import ModelRegistry, get_model_registry
+
+DEFAULT_CROSSENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+class RerankerRegistry:
+    """
+    Cross-encoder front end of the process-wide ModelRegistry: models are loaded once
+    and shared with every other user of the registry (which also bounds how many stay
+    resident); this class adds warm-up and scoring with latency accounting.
+    """
+
+    def __init__(self, models: Optional[ModelRegistry] = None):
+        self.models = models or get_model_registry()
+        self._lock = threading.Lock()
+        self._timings = {
+            "scores": 0,
+            "score_ms_total": 0.0,
+            "last_score_ms": 0.0,
+        }
+
+    def get(self, model_name: str = DEFAULT_CROSSENCODER, device: Optional[str] = None):
+        return self.models.get("crossencoder", model_name, device)
+
+    def warm_up(self, model_name: str = DEFAULT_CROSSENCODER, device: Optional[str] = None) -> None:
+        # A first predict() also pays one-off tokenizer/kernel setup, so run a dummy pair,
+        # but only once: a model already resident has been warmed up when it was loaded.
+        if self.models.is_loaded("crossencoder", model_name, device):
+            return
+        model = self.get(model_name, device)
+        start = time.perf_counter()
+        model.predict([("warm up", "warm up")])
+        print(f"[RERANK] Warm-up predict for {model_name} took {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def score(
+        self,
+        query: str,
+        passages: Sequence[str],
+        model_name: str = DEFAULT_CROSSENCODER,
+        device: Optional[str] = None,
+    ) -> List[float]:
+        if not passages:
+            return []
+        model = self.get(model_name, device)
+        start = time.perf_counter()
+        scores = model.predict([(query, p) for p in passages])
+        score_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._timings["scores"] += 1
+            self._timings["score_ms_total"] += score_ms
+            self._timings["last_score_ms"] = score_ms
+        print(f"[RERANK] Scored {len(passages)} pairs with {model_name} in {score_ms:.1f} ms")
+        return [float(s) for s in scores]
+
+    def loaded_models(self) -> List[Tuple[str, str]]:
+        return [(name, device) for _, name, device in self.models.loaded("crossencoder")]
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._timings)
+        loaded = [m for m in self.models.stats()["models"] if m["kind"] == "crossencoder"]
+        out["loads"] = len(loaded)
+        out["load_ms_total"] = sum(m["load_ms"] for m in loaded)
+        out["resident_models"] = [f"{m['model']}@{m['device']}" for m in loaded]
+        return out
+
+
+_registry = RerankerRegistry()
+
+
+def get_reranker_registry() -> RerankerRegistry:
+    return _registry
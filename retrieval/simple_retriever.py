@@ -1,11 +1,19 @@
+from __future__ import annotations
+
 import os
-from typing import List, Tuple
-from langchain_chroma import Chroma  # [3][2]
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from langchain_core.embeddings import Embeddings
 from langchain_core.documents import Document
-from sentence_transformers import CrossEncoder  # [9][10]
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma  # [3][2]
+
+from retrieval.reranker import DEFAULT_CROSSENCODER, get_reranker_registry
 
 def load_chroma(persist_directory: str, embedding: Embeddings, collection_name: str) -> Chroma:
+    from langchain_chroma import Chroma  # deferred: pulls in chromadb
+
     persist_abs = os.path.abspath(persist_directory)
     print(f"[DEBUG] Reopen Chroma @ {persist_abs} collection={collection_name}")
     return Chroma(
@@ -17,32 +25,81 @@ def load_chroma(persist_directory: str, embedding: Embeddings, collection_name:
 def _pairwise_inputs(query: str, docs: List[Document]) -> List[Tuple[str, str]]:
     return [(query, d.page_content) for d in docs]
 
+def embed_query(query: str, chroma: Chroma, timings: Optional[Dict[str, float]] = None) -> List[float]:
+    t0 = time.perf_counter()
+    vector = chroma.embeddings.embed_query(query)
+    if timings is not None:
+        timings["embed_ms"] = (time.perf_counter() - t0) * 1000
+    return vector
+
+def search_candidates(
+    query: str,
+    chroma: Chroma,
+    pool_k: int = 40,
+    query_embedding: Optional[List[float]] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> Tuple[List[Document], List[float]]:
+    """
+    Embed the query once (unless a vector is supplied) and run a single ANN search.
+    Returns the candidate pool together with the query vector so callers can reuse both.
+    """
+    if query_embedding is None:
+        query_embedding = embed_query(query, chroma, timings)
+    t0 = time.perf_counter()
+    pool_docs = chroma.similarity_search_by_vector(query_embedding, k=pool_k)
+    if timings is not None:
+        timings["search_ms"] = (time.perf_counter() - t0) * 1000
+    return pool_docs, query_embedding
+
+def rerank_candidates(
+    query: str,
+    candidates: List[Document],
+    crossencoder_model: str = DEFAULT_CROSSENCODER,
+    top_k: int = 5,
+    device: Optional[str] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> List[Document]:
+    if not candidates:
+        return []
+    t0 = time.perf_counter()
+    # CrossEncoder stays resident in the registry, so only scoring is paid per query
+    scores = get_reranker_registry().score(
+        query, [d.page_content for d in candidates], model_name=crossencoder_model, device=device
+    )
+    ranked = sorted(zip(candidates, scores), key=lambda x: float(x[1]), reverse=True)
+    if timings is not None:
+        timings["rerank_ms"] = (time.perf_counter() - t0) * 1000
+    return [d for d, s in ranked[:top_k]]
+
 def retrieve_with_crossencoder_rerank(
     query: str,
     chroma: Chroma,
-    crossencoder_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    crossencoder_model: str = DEFAULT_CROSSENCODER,
     pool_k: int = 40,
     top_k: int = 5,
+    device: Optional[str] = None,
+    candidates: Optional[List[Document]] = None,
+    query_embedding: Optional[List[float]] = None,
+    timings: Optional[Dict[str, float]] = None,
 ) -> List[Document]:
     if not query or not query.strip():
         print("[WARN] Empty query provided to retriever.")
         return []
-    # Verify collection not empty
-    try:
-        cnt = chroma._collection.count()
-        print(f"[DEBUG] Collection count: {cnt}")
-        if cnt == 0:
-            print("[ERROR] Chroma collection is empty. Re-run embedding or fix collection name/path.")
-            return []
-    except Exception:
-        pass
-
-    pool_docs = chroma.similarity_search(query, k=pool_k)  # [2]
-    if not pool_docs:
+
+    if candidates is None:
+        # Verify collection not empty
+        try:
+            cnt = chroma._collection.count()
+            print(f"[DEBUG] Collection count: {cnt}")
+            if cnt == 0:
+                print("[ERROR] Chroma collection is empty. Re-run embedding or fix collection name/path.")
+                return []
+        except Exception:
+            pass
+        candidates, _ = search_candidates(query, chroma, pool_k, query_embedding, timings)
+
+    if not candidates:
         print("[WARN] similarity_search returned 0 candidates.")
         return []
 
-    reranker = CrossEncoder(crossencoder_model)
-    scores = reranker.predict(_pairwise_inputs(query, pool_docs))  # [9][10]
-    ranked = sorted(zip(pool_docs, scores), key=lambda x: float(x[1]), reverse=True)
-    return [d for d, s in ranked[:top_k]]
+    return rerank_candidates(query, candidates, crossencoder_model, top_k, device, timings)
@@ -0,0 +1,74 @@
+"""
+Offset check for the chunking strategies: every chunk with a start_char must be the
+exact slice text[start_char:end_char] of its document.
+
+    python -m tools.check_chunk_offsets                          # all strategies
+    python -m tools.check_chunk_offsets --strategy token --strategy structure
+
+Chunks the splitter does not return verbatim (the sentence strategy decodes wordpieces)
+are reported with offsets -1 and are not failures; a wrong offset is. Exits 1 on any
+mismatch, or when a strategy's splitter can't be built.
+"""
+import argparse
+import sys
+from typing import List
+
+from langchain_core.documents import Document
+
+from chunking.chunker import STRATEGIES, STRUCTURE, Chunker
+
+SAMPLE = (
+    "[blender pro 900]\n"
+    "the blender pro 900 crushes ice in seconds and purees soups without a second pass. "
+    "its steel blades are removable for cleaning, and the jar is dishwasher safe.\n\n"
+    "[specifications]\n"
+    "weight: 2.5 kg\n"
+    "power: 900 w\n"
+    "capacity: 1.8 l\n\n"
+    "key features:\n"
+    + "quiet motor, six speeds, pulse mode, self-cleaning program, overload protection. " * 40
+)
+
+
+def check(strategy: str, texts: List[str]) -> List[str]:
+    chunker = Chunker(strategy=strategy, workers=1)
+    chunker.backup = lambda chunks: None  # nothing to persist for a check
+    docs = [Document(page_content=t, metadata={"doc_id": f"doc-{i}"}) for i, t in enumerate(texts)]
+    chunks = chunker.chunk_documents(docs)
+    failures = []
+    unplaced = 0
+    for chunk in chunks:
+        meta = chunk.metadata
+        start, end = meta["start_char"], meta["end_char"]
+        if start < 0:
+            unplaced += 1
+            continue
+        text = texts[int(meta["doc_id"].split("-")[1])]
+        if text[start:end] != chunk.page_content:
+            failures.append(f"{strategy}: chunk {meta['chunk_index']} of {meta['doc_id']} "
+                            f"does not match text[{start}:{end}]")
+    print(f"[OFFSETS] {strategy}: {len(chunks)} chunks, {unplaced} without offsets, {len(failures)} mismatched")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check chunk start_char/end_char against the source text")
+    parser.add_argument("--strategy", action="append", choices=list(STRATEGIES) + [STRUCTURE],
+                        help="strategy to check (repeatable); default: all of them")
+    args = parser.parse_args()
+
+    failures = []
+    for strategy in args.strategy or list(STRATEGIES) + [STRUCTURE]:
+        try:
+            failures += check(strategy, [SAMPLE, " ".join(SAMPLE.split())])
+        except Exception as e:
+            failures.append(f"{strategy}: {type(e).__name__}: {e}")
+    for failure in failures:
+        print(f"[OFFSETS] FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("[OFFSETS] OK")
+
+
+if __name__ == "__main__":
+    main()
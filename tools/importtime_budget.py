@@ -0,0 +1,89 @@
+"""
+Cold-start import budget for the entry points, measured with `python -X importtime`.
+
+    python -m tools.importtime_budget                    # backend and main, default budget
+    python -m tools.importtime_budget --module backend --budget-ms 800
+
+Fails (exit 1) when importing a module takes longer than the budget, or when it pulls
+in a heavy dependency that should only be imported on first use (torch, chromadb, ...).
+Run it in CI next to the app's own environment; timings vary by machine, so keep the
+budget generous and rely on the forbidden-module check to catch regressions.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["backend", "main"]
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+# Must not be imported just by importing an entry point; they load on first real use.
+DEFERRED_MODULES = [
+    "torch",
+    "sentence_transformers",
+    "transformers",
+    "chromadb",
+    "langchain_chroma",
+    "langchain_community.vectorstores",
+    "langchain.chains",
+    "langchain.memory",
+    "langchain_groq",
+    "langchain_text_splitters",
+]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, int]]:
+    """(cumulative ms for `module`, {imported module: cumulative us})."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+    imported = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            imported[match.group(4)] = int(match.group(2))
+    return imported.get(module, 0) / 1000, imported
+
+
+def check(module: str, budget_ms: float) -> List[str]:
+    total_ms, imported = measure(module)
+    slowest = sorted(imported.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    print(f"[IMPORT] {module}: {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    for name, us in slowest:
+        print(f"[IMPORT]   {us / 1000:8.1f} ms  {name}")
+
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"{module} took {total_ms:.0f} ms to import, budget is {budget_ms:.0f} ms")
+    for name in DEFERRED_MODULES:
+        if name in imported:
+            problems.append(f"{module} imports {name} at startup; defer it to first use")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry-point import time against a budget")
+    parser.add_argument("--module", action="append", help="module to import (repeatable)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="max cumulative import time")
+    args = parser.parse_args()
+
+    problems = []
+    for module in args.module or DEFAULT_MODULES:
+        problems.extend(check(module, args.budget_ms))
+    for problem in problems:
+        print(f"[IMPORT] FAIL: {problem}")
+    if problems:
+        sys.exit(1)
+    print("[IMPORT] OK")
+
+
+if __name__ == "__main__":
+    main()
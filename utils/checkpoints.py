@@ -0,0 +1,282 @@
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+try:
+    import msgpack  # optional: smaller and faster than JSON for checkpoint payloads
+except ImportError:
+    msgpack = None
+
+# "framed" = compressed length-prefixed records (.ckpt); "jsonl" = the old text backups
+CHECKPOINT_FORMAT = os.getenv("CHECKPOINT_FORMAT", "framed")
+CHECKPOINT_LEVEL = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", "6"))
+CHECKPOINT_BLOCK_RECORDS = int(os.getenv("CHECKPOINT_BLOCK_RECORDS", "256"))
+
+_MAGIC = b"RAGCKPT1"
+_HEADER = len(_MAGIC) + 1  # magic + codec byte
+# frame: ids length, payload length, "\n"-joined ids (utf-8), zlib(encoded list of records)
+_FRAME = struct.Struct(">II")
+
+
+def _record(doc_id: str, page_content: str, metadata: dict) -> dict:
+    return {"id": doc_id, "page_content": page_content, "metadata": metadata}
+
+
+class JSONLCheckpointStore:
+    """The original one-JSON-object-per-line backups, rewritten on every run."""
+
+    extension = ".jsonl"
+
+    def path_for(self, path: str) -> str:
+        return os.path.splitext(path)[0] + self.extension
+
+    def writer(self, path: str, append: bool = False) -> "_JSONLWriter":
+        return _JSONLWriter(self.path_for(path), append)
+
+    def iter_records(self, path: str, ids: Optional[set] = None, latest: bool = False) -> Iterator[dict]:
+        path = self.path_for(path)
+        if not os.path.exists(path):
+            return
+        records = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    if ids is None or record.get("id") in ids:
+                        if not latest:
+                            yield record
+                        else:
+                            records.pop(record.get("id"), None)
+                            records[record.get("id")] = record
+        yield from records.values()
+
+    def ids(self, path: str) -> set:
+        return {record.get("id") for record in self.iter_records(path)}
+
+    def iter_documents(self, path: str, ids: Optional[set] = None, latest: bool = False) -> Iterator[Document]:
+        for record in self.iter_records(path, ids, latest):
+            yield Document(page_content=record["page_content"], metadata=record.get("metadata") or {})
+
+
+class _JSONLWriter:
+    def __init__(self, path: str, append: bool):
+        self.path = path
+        self.count = 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, doc_id: str, page_content: str, metadata: dict):
+        json.dump(_record(doc_id, page_content, metadata), self._file, ensure_ascii=False)
+        self._file.write("\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FramedCheckpointStore:
+    """
+    Append-only stage checkpoints: records are written in length-prefixed frames of up to
+    `block_records` records, each frame holding the records' stable IDs in clear and one
+    zlib-compressed msgpack (or JSON) block. Readers mmap the file and index IDs without
+    decompressing anything, and a stage can resume from whatever complete frames are on
+    disk. Records come back in write order, duplicates included; with `latest=True` a
+    later record with the same ID supersedes an earlier one.
+    """
+
+    extension = ".ckpt"
+
+    def __init__(self, level: int = CHECKPOINT_LEVEL, block_records: int = CHECKPOINT_BLOCK_RECORDS):
+        self.level = level
+        self.block_records = max(1, block_records)
+
+    def path_for(self, path: str) -> str:
+        return os.path.splitext(path)[0] + self.extension
+
+    def writer(self, path: str, append: bool = False) -> "_FramedWriter":
+        return _FramedWriter(self.path_for(path), append, self.level, self.block_records)
+
+    @staticmethod
+    def _frames(buf) -> Iterator[Tuple[List[str], int, int]]:
+        """(ids, payload offset, payload length) per complete frame, in file order."""
+        offset = _HEADER
+        end = len(buf)
+        while offset + _FRAME.size <= end:
+            ids_len, payload_len = _FRAME.unpack_from(buf, offset)
+            start = offset + _FRAME.size
+            payload_start = start + ids_len
+            if payload_start + payload_len > end:
+                return  # truncated tail from an interrupted write
+            try:
+                ids = bytes(buf[start:payload_start]).decode("utf-8").split("\n")
+            except UnicodeDecodeError:
+                return  # garbage after an interrupted write
+            yield ids, payload_start, payload_len
+            offset = payload_start + payload_len
+
+    @classmethod
+    def complete_length(cls, path: str) -> int:
+        """Bytes of `path` up to the end of its last complete frame (the header alone if none)."""
+        f, buf = cls._open(path)
+        if buf is None:
+            return 0
+        try:
+            end = _HEADER
+            for _, start, length in cls._frames(buf):
+                end = start + length
+            return end
+        finally:
+            buf.close()
+            f.close()
+
+    @staticmethod
+    def _open(path: str):
+        if not os.path.exists(path) or os.path.getsize(path) < _HEADER:
+            return None, None
+        f = open(path, "rb")
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buf[:len(_MAGIC)] != _MAGIC:
+            buf.close()
+            f.close()
+            raise ValueError(f"{path} is not a checkpoint file")
+        return f, buf
+
+    def iter_records(self, path: str, ids: Optional[set] = None, latest: bool = False) -> Iterator[dict]:
+        f, buf = self._open(self.path_for(path))
+        if buf is None:
+            return
+        try:
+            frames = list(self._frames(buf))
+            last_seen = {}
+            if latest:
+                for n, (frame_ids, _, _) in enumerate(frames):
+                    for pos, doc_id in enumerate(frame_ids):
+                        last_seen[doc_id] = (n, pos)
+            decode = _decoder(buf[len(_MAGIC):_HEADER])
+            for n, (frame_ids, start, length) in enumerate(frames):
+                wanted = [
+                    pos for pos, doc_id in enumerate(frame_ids)
+                    if (not latest or last_seen[doc_id] == (n, pos)) and (ids is None or doc_id in ids)
+                ]
+                if not wanted:
+                    continue
+                try:
+                    records = decode(zlib.decompress(buf[start:start + length]))
+                except zlib.error as e:
+                    # a frame spliced onto a partial one by an older appender: treat it like a truncated tail
+                    print(f"[CHECKPOINT] Stopping at an unreadable frame in {self.path_for(path)}: {e}")
+                    return
+                for pos in wanted:
+                    yield records[pos]
+        finally:
+            buf.close()
+            f.close()
+
+    def ids(self, path: str) -> set:
+        f, buf = self._open(self.path_for(path))
+        if buf is None:
+            return set()
+        try:
+            return {doc_id for frame_ids, _, _ in self._frames(buf) for doc_id in frame_ids}
+        finally:
+            buf.close()
+            f.close()
+
+    def iter_documents(self, path: str, ids: Optional[set] = None, latest: bool = False) -> Iterator[Document]:
+        for record in self.iter_records(path, ids, latest):
+            yield Document(page_content=record["page_content"], metadata=record.get("metadata") or {})
+
+
+def _encoder(codec: bytes):
+    if codec == b"m":
+        return lambda record: msgpack.packb(record, use_bin_type=True)
+    return lambda record: json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+
+def _decoder(codec: bytes):
+    if codec == b"m":
+        if msgpack is None:
+            raise RuntimeError("checkpoint was written with msgpack, which is not installed")
+        return lambda data: msgpack.unpackb(data, raw=False)
+    return lambda data: json.loads(data.decode("utf-8"))
+
+
+class _FramedWriter:
+    def __init__(self, path: str, append: bool, level: int, block_records: int):
+        self.path = path
+        self.level = level
+        self.block_records = block_records
+        self.count = 0
+        self._ids: List[str] = []
+        self._records: List[dict] = []
+        existing = append and os.path.exists(path) and os.path.getsize(path) >= _HEADER
+        if existing:
+            with open(path, "rb") as f:
+                header = f.read(_HEADER)
+            if header[:len(_MAGIC)] != _MAGIC:
+                raise ValueError(f"{path} is not a checkpoint file")
+            codec = header[len(_MAGIC):]
+            # drop a partial frame left by an interrupted write, so new frames start on a boundary
+            end = FramedCheckpointStore.complete_length(path)
+            if end < os.path.getsize(path):
+                print(f"[CHECKPOINT] Dropping {os.path.getsize(path) - end} bytes of incomplete frame from {path}")
+                os.truncate(path, end)
+            self._file = open(path, "ab")
+        else:
+            codec = b"m" if msgpack is not None else b"j"
+            self._file = open(path, "wb")
+            self._file.write(_MAGIC + codec)
+        self._encode = _encoder(codec)
+
+    def write(self, doc_id: str, page_content: str, metadata: dict):
+        self._ids.append(str(doc_id).replace("\n", " "))
+        self._records.append(_record(doc_id, page_content, metadata))
+        self.count += 1
+        if len(self._records) >= self.block_records:
+            self.flush()
+
+    def flush(self):
+        if not self._records:
+            return
+        ids = "\n".join(self._ids).encode("utf-8")
+        payload = zlib.compress(self._encode(self._records), self.level)
+        self._file.write(_FRAME.pack(len(ids), len(payload)) + ids + payload)
+        self._file.flush()
+        self._ids, self._records = [], []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_checkpoint_store(fmt: str = CHECKPOINT_FORMAT):
+    if fmt == "jsonl":
+        return JSONLCheckpointStore()
+    if fmt == "framed":
+        return FramedCheckpointStore()
+    raise ValueError(f"Unknown checkpoint format: {fmt}")
+
+
+def load_checkpoint(path: str, store=None) -> List[Document]:
+    """A stage's last output, so the next stage can resume without re-running upstream ones."""
+    store = store or get_checkpoint_store()
+    docs = list(store.iter_documents(path))
+    print(f"[CHECKPOINT] Loaded {len(docs)} documents from {store.path_for(path)}")
+    return docs
@@ -0,0 +1,16 @@
+import hashlib
+from langchain_core.documents import Document
+
+_SEP = "\x1f"
+
+
+def stable_id(*parts) -> str:
+    """Deterministic 32-hex-char ID from the given parts (e.g. source, page/field, offset)."""
+    key = _SEP.join("" if p is None else str(p) for p in parts)
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def document_id(doc: Document, ordinal: int) -> str:
+    """The document's `doc_id` metadata, or an ID derived from its source and position."""
+    meta = doc.metadata or {}
+    return meta.get("doc_id") or stable_id(meta.get("source", ""), ordinal)
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# "kind:model_name[@device]" entries, comma separated, loaded by preload() at startup
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "")
+RERANKER_CACHE_SIZE = int(os.getenv("RERANKER_CACHE_SIZE", "2"))
+
+
+def _load_embedding(model_name: str, device: Optional[str]):
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=model_name, model_kwargs={"device": device or "cpu"})
+
+
+def _load_crossencoder(model_name: str, device: Optional[str]):
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device=device)
+
+
+def _load_tokenizer(model_name: str, device: Optional[str]):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def _torch_module(model):
+    # HuggingFaceEmbeddings keeps the SentenceTransformer in `_client`/`client`, CrossEncoder in `model`
+    for candidate in (model, getattr(model, "_client", None), getattr(model, "client", None), getattr(model, "model", None)):
+        if candidate is not None and hasattr(candidate, "parameters") and hasattr(candidate, "buffers"):
+            return candidate
+    return None
+
+
+def footprint_bytes(model) -> Optional[int]:
+    """Bytes held by the model's parameters and buffers, or None for non-torch objects."""
+    module = _torch_module(model)
+    if module is None:
+        return None
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return None
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded models (embedding models, cross-encoders, tokenizers)
+    keyed by (kind, model_name, device). Each model is loaded lazily, once, under a
+    per-key lock so concurrent first requests don't load it twice; kinds listed in
+    `max_models` keep only that many models resident, evicting the least recently used.
+    """
+
+    def __init__(self, max_models: Optional[Dict[str, int]] = None):
+        self.max_models = dict(max_models or {})
+        self._loaders: Dict[str, Callable] = {
+            "embedding": _load_embedding,
+            "crossencoder": _load_crossencoder,
+            "tokenizer": _load_tokenizer,
+        }
+        self._models: "OrderedDict[Tuple[str, str, str], object]" = OrderedDict()
+        self._info: Dict[Tuple[str, str, str], dict] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+    def register_loader(self, kind: str, loader: Callable):
+        """`loader(model_name, device)` returns the loaded model."""
+        self._loaders[kind] = loader
+
+    @staticmethod
+    def _key(kind: str, model_name: str, device: Optional[str]) -> Tuple[str, str, str]:
+        return (kind, model_name, device or "auto")
+
+    def get(self, kind: str, model_name: str, device: Optional[str] = None):
+        if kind not in self._loaders:
+            raise ValueError(f"No loader registered for model kind '{kind}'")
+        key = self._key(kind, model_name, device)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self._info[key]["uses"] += 1
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Load outside the registry lock so lookups of other models are not blocked
+        with load_lock:
+            with self._lock:
+                model = self._models.get(key)
+                if model is not None:
+                    self._models.move_to_end(key)
+                    self._info[key]["uses"] += 1
+                    return model
+
+            start = time.perf_counter()
+            model = self._loaders[kind](model_name, device)
+            load_ms = (time.perf_counter() - start) * 1000
+            size = footprint_bytes(model)
+            size_text = f", {size / 1e6:.0f} MB" if size is not None else ""
+            print(f"[MODELS] Loaded {kind} {model_name} on {key[2]} in {load_ms:.1f} ms{size_text}")
+
+            with self._lock:
+                self._models[key] = model
+                self._info[key] = {"load_ms": load_ms, "bytes": size, "uses": 1, "loaded_at": time.time()}
+                self._evict_locked(kind)
+            return model
+
+    def _evict_locked(self, kind: str):
+        limit = self.max_models.get(kind)
+        if not limit:
+            return
+        keys = [k for k in self._models if k[0] == kind]
+        for key in keys[:max(0, len(keys) - limit)]:
+            self._models.pop(key)
+            self._info.pop(key, None)
+            self._load_locks.pop(key, None)
+            print(f"[MODELS] Evicted {kind} {key[1]} on {key[2]}")
+
+    def preload(self, spec: str = MODEL_PRELOAD) -> List[Tuple[str, str, str]]:
+        """Load every "kind:model_name[@device]" entry of `spec` (comma separated)."""
+        loaded = []
+        for entry in (e.strip() for e in spec.split(",")):
+            if not entry:
+                continue
+            try:
+                kind, name = entry.split(":", 1)
+                name, _, device = name.partition("@")
+                self.get(kind.strip(), name.strip(), device.strip() or None)
+                loaded.append(self._key(kind.strip(), name.strip(), device.strip() or None))
+            except Exception as e:
+                print(f"[MODELS] Failed to preload '{entry}': {e}")
+        return loaded
+
+    def is_loaded(self, kind: str, model_name: str, device: Optional[str] = None) -> bool:
+        with self._lock:
+            return self._key(kind, model_name, device) in self._models
+
+    def loaded(self, kind: Optional[str] = None) -> List[Tuple[str, str, str]]:
+        with self._lock:
+            return [k for k in self._models if kind is None or k[0] == kind]
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = [
+                {"kind": k[0], "model": k[1], "device": k[2], **self._info.get(k, {})}
+                for k in self._models
+            ]
+        return {
+            "models": models,
+            "total_bytes": sum(m.get("bytes") or 0 for m in models),
+        }
+
+
+_registry = ModelRegistry(max_models={"crossencoder": RERANKER_CACHE_SIZE})
+
+
+def get_model_registry() -> ModelRegistry:
+    return _registry
@@ -0,0 +1,39 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# tasks in flight per worker: enough to keep every worker busy while results are consumed
+IN_FLIGHT_PER_WORKER = 2
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    it = iter(items)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def submit_bounded(
+    pool: Executor,
+    tasks: Iterable[T],
+    submit: Callable[[Executor, T], Optional[Future]],
+    workers: int,
+) -> Iterator[Tuple[T, Optional[Future]]]:
+    """
+    Submit `tasks` lazily through `submit(pool, task)` and yield (task, future) in submission
+    order, keeping at most workers * IN_FLIGHT_PER_WORKER tasks submitted but not yet yielded,
+    so memory stays bounded however long `tasks` is. The caller waits on each future.
+    """
+    window = deque()
+    limit = max(1, workers) * IN_FLIGHT_PER_WORKER
+    for task in tasks:
+        window.append((task, submit(pool, task)))
+        if len(window) >= limit:
+            yield window.popleft()
+    while window:
+        yield window.popleft()